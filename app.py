@@ -1,19 +1,37 @@
+import gzip
+import hashlib
+import json
 import logging
 
 from flask import (
     Flask,
+    Response,
     jsonify,
+    make_response,
     redirect,
     render_template,
     render_template_string,
     request,
+    stream_with_context,
     url_for,
 )
+from services.breaker import reset_breakers
 from services.config_manager import ConfigManager
+from services.deletion import validate_item
+from services.health import HealthMonitor
+from services.jobs import DeletionJobQueue
 from services.matcher import MatcherService
-from services.qbittorrent import QBitClient
-from services.radarr import RadarrClient
-from services.sonarr import SonarrClient
+from services.media_query import parse_query, query_media
+from services.metrics import CONDITIONAL_RESPONSES, SNAPSHOT_BUILDS
+from services.profiling import span, tracing
+from services.shared_metrics import render_metrics
+from services.snapshot import BuildAborted, SnapshotBuilder, SnapshotCache
+from services.whatif import SWEEP_AXES, parse_axis, sweep
+
+try:
+    import brotli
+except ImportError:  # optional, gzip is used when it is missing
+    brotli = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -21,6 +39,100 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
+# Settings of the deletability rules; the others are connection settings
+RULE_KEYS = ("DISK_THRESHOLD", "MIN_SEED_WEEKS", "MIN_RATIO")
+
+
+def get_rules_config():
+    cm = ConfigManager()
+    return {
+        "disk_threshold": cm.get("DISK_THRESHOLD", 90),
+        "min_seed_weeks": cm.get("MIN_SEED_WEEKS", 4),
+        "min_ratio": cm.get("MIN_RATIO", 1.0),
+    }
+
+
+def get_snapshot():
+    """Returns the cached scan snapshot; ?refresh=1 forces a rebuild."""
+    force = request.args.get("refresh", "0") not in ("0", "", "false")
+    return SnapshotCache().get(get_rules_config(), force=force)
+
+
+def snapshot_age(snapshot):
+    return round(SnapshotCache().age(snapshot), 1)
+
+
+def request_etag(version):
+    """ETag for the current request: content version plus path and query."""
+    args = sorted((k, v) for k, v in request.args.items(multi=True) if k != "refresh")
+    key = f"{version}|{request.path}|{args}"
+    return hashlib.sha1(key.encode()).hexdigest()[:24]
+
+
+def etag_response(version, render):
+    """
+    Answers If-None-Match with 304 when the content `version` has not changed,
+    otherwise builds the body with render(). ETags are weak because the body is
+    compressed per client.
+    """
+    etag = request_etag(version)
+    if request.if_none_match.contains_weak(etag):
+        CONDITIONAL_RESPONSES.inc(result="not_modified")
+        response = make_response("", 304)
+    else:
+        CONDITIONAL_RESPONSES.inc(result="full")
+        response = make_response(render())
+    response.set_etag(etag, weak=True)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+def conditional_response(snapshot, render):
+    """etag_response() for content derived from the scan snapshot."""
+    response = etag_response(snapshot["version"], render)
+    response.headers["X-Snapshot-Age"] = str(snapshot_age(snapshot))
+    return response
+
+
+@app.before_request
+def reload_settings():
+    # Settings saved by another worker process
+    changed = ConfigManager().reload_if_changed()
+    if changed:
+        logger.info(f"Settings changed on disk, reloaded {sorted(changed)}.")
+    if changed - set(RULE_KEYS):
+        # Failures of the old connection settings say nothing about the new ones
+        reset_breakers()
+        HealthMonitor().refresh()
+
+
+@app.after_request
+def compress_response(response):
+    if (
+        response.status_code != 200
+        or response.is_streamed
+        or response.direct_passthrough
+        or "Content-Encoding" in response.headers
+    ):
+        return response
+
+    data = response.get_data()
+    if len(data) < int(ConfigManager().get("COMPRESS_MIN_SIZE", 1024)):
+        return response
+
+    accept = request.accept_encodings
+    if brotli is not None and accept.quality("br") > 0:
+        data, encoding = brotli.compress(data, quality=4), "br"
+    elif accept.quality("gzip") > 0:
+        data, encoding = gzip.compress(data, compresslevel=5), "gzip"
+    else:
+        return response
+
+    response.set_data(data)
+    response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    return response
+
 
 @app.route("/")
 def index():
@@ -35,74 +147,271 @@ def index():
             }
         )
 
-    config = {
-        "disk_threshold": cm.get("DISK_THRESHOLD", 90),
-        "min_seed_weeks": cm.get("MIN_SEED_WEEKS", 4),
-        "min_ratio": cm.get("MIN_RATIO", 1.0),
-    }
+    config = get_rules_config()
     return render_template("index.html", config=config)
 
 
 @app.route("/api/status_html")
 def status_html():
-    matcher = MatcherService()
-    service_statuses = matcher.get_service_statuses()
-    return render_template("partials/status.html", service_statuses=service_statuses)
+    # Read from the background prober, so this never waits on a service
+    service_statuses = HealthMonitor().statuses()
+    version = json.dumps(service_statuses, sort_keys=True)
+    return etag_response(
+        version,
+        lambda: render_template(
+            "partials/status.html", service_statuses=service_statuses
+        ),
+    )
+
+
+@app.route("/api/health")
+def api_health():
+    """
+    Last health probe per service: {"Radarr": {"online", "checked_at",
+    "changed_at", "latency_ms", "circuit": {"state", "failures", "backoff",
+    "retry_in", "changed_at"}}, ...}.
+    """
+    return jsonify(HealthMonitor().details())
 
 
 @app.route("/api/disk_html")
 def disk_html():
-    matcher = MatcherService()
-    disk_usage = matcher.get_disk_usage()
-    return render_template("partials/disk.html", disk_usage=disk_usage)
+    snapshot = get_snapshot()
+    disk_usage = snapshot["disk_usage"]
+    return conditional_response(
+        snapshot,
+        lambda: render_template("partials/disk.html", disk_usage=disk_usage),
+    )
 
 
 @app.route("/api/media_html")
 def media_html():
-    cm = ConfigManager()
-    config = {
-        "disk_threshold": cm.get("DISK_THRESHOLD", 90),
-        "min_seed_weeks": cm.get("MIN_SEED_WEEKS", 4),
-        "min_ratio": cm.get("MIN_RATIO", 1.0),
-    }
-    matcher = MatcherService()
-    media_items_raw = matcher.get_aggregated_media(config=config)
-    media_items = [item for item in media_items_raw if item.get("file_loaded")]
-    return render_template(
-        "partials/media_rows.html", media_items=media_items, config=config
+    snapshot = get_snapshot()
+    config = snapshot["config"]
+    media_items = snapshot["loaded_media"]
+    return conditional_response(
+        snapshot,
+        lambda: render_template(
+            "partials/media_rows.html", media_items=media_items, config=config
+        ),
     )
 
 
-@app.route("/api/scan")
-def api_scan():
-    cm = ConfigManager()
-    config = {
-        "disk_threshold": cm.get("DISK_THRESHOLD", 90),
-        "min_seed_weeks": cm.get("MIN_SEED_WEEKS", 4),
-        "min_ratio": cm.get("MIN_RATIO", 1.0),
+def scan_payload(snapshot, query):
+    """Body of /api/scan for `query` (see parse_query)."""
+    media_items = snapshot["loaded_media"]
+    eligible_items = sum(1 for item in media_items if item.deletable)
+    with span("query"):
+        result = query_media(media_items, snapshot["orders"], query)
+    with span("serialize"):
+        media = [item.to_dict() for item in result["media"]]
+
+    return {
+        "config": snapshot["config"],
+        "disk_usage": snapshot["disk_usage"],
+        "services": snapshot["services"],
+        "stale_sources": snapshot["stale_sources"],
+        "stats": {"total": len(media_items), "eligible": eligible_items},
+        "media": media,
+        "page": result["page"],
+        "snapshot": {
+            "age": snapshot_age(snapshot),
+            "built_at": snapshot["built_at"],
+            "version": snapshot["version"],
+        },
     }
 
-    matcher = MatcherService()
-    disk_usage = matcher.get_disk_usage()
-    service_statuses = matcher.get_service_statuses()
-    media_items_raw = matcher.get_aggregated_media(config=config)
-    media_items = [item for item in media_items_raw if item.get("file_loaded")]
 
-    # Calculate stats
-    total_items = len(media_items)
-    eligible_items = sum(1 for item in media_items if item.get("deletable"))
+def profile_response(trace):
+    """The trace as JSON, or as a Chrome trace file with ?format=trace."""
+    if request.args.get("format") == "trace":
+        response = jsonify(trace.to_chrome())
+        response.headers["Content-Disposition"] = "attachment; filename=scan-trace.json"
+        return response
+    return jsonify(trace.to_dict())
+
+
+@app.route("/api/scan")
+def api_scan():
+    """
+    Paged scan result. Query args: offset, limit, sort, order (asc|desc),
+    origin, deletable, watched and q (title search); an invalid value is a
+    400. Without limit every matching item is returned, and limit is capped at
+    MAX_LIMIT.
+
+    With ?profile=1 the snapshot is rebuilt under a profiling trace, attached
+    as "profile" (span timings, slowest items and a Chrome trace); add
+    format=trace to download the Chrome trace only.
+    """
+    try:
+        query = parse_query(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if request.args.get("profile", "0") in ("0", "", "false"):
+        snapshot = get_snapshot()
+        return conditional_response(
+            snapshot, lambda: jsonify(scan_payload(snapshot, query))
+        )
+
+    with tracing("scan") as trace:
+        snapshot = SnapshotCache().refresh(get_rules_config())
+        payload = scan_payload(snapshot, query)
+    if request.args.get("format") == "trace":
+        return profile_response(trace)
+    payload["profile"] = trace.to_dict()
+    return jsonify(payload)
+
+
+@app.route("/api/profile")
+def api_profile():
+    """Trace of the last profiled snapshot build (PROFILE_SCANS or ?profile=1)."""
+    trace = SnapshotCache().last_trace
+    if trace is None:
+        return jsonify({"error": "No profiled scan yet"}), 404
+    return profile_response(trace)
+
+
+@app.route("/api/whatif", methods=["POST"])
+def api_whatif():
+    """
+    What-if policy sweep over the cached scan. Body: {"min_ratio": ...,
+    "min_seed_weeks": ..., "disk_threshold": ...}, each a number, a list or a
+    {"start", "stop", "step"} range; a missing axis uses the current setting.
+    Returns the eligible count and reclaimable bytes of every combination,
+    indexed [min_ratio][min_seed_weeks][disk_threshold].
+    """
+    payload = request.get_json(silent=True) or {}
+    snapshot = get_snapshot()
+    config = snapshot["config"]
+
+    try:
+        axes = {name: parse_axis(payload.get(name), config[name]) for name in SWEEP_AXES}
+        result = sweep(snapshot["loaded_media"], snapshot["disk_usage"], axes)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
     return jsonify(
         {
-            "config": config,
-            "disk_usage": disk_usage,
-            "services": service_statuses,
-            "stats": {"total": total_items, "eligible": eligible_items},
-            "media": media_items,
+            "axes": {name: axis.tolist() for name, axis in axes.items()},
+            "eligible": result["eligible"].tolist(),
+            "reclaimable_bytes": result["reclaimable_bytes"].tolist(),
+            "total": len(snapshot["loaded_media"]),
+            "snapshot": {
+                "age": snapshot_age(snapshot),
+                "built_at": snapshot["built_at"],
+                "version": snapshot["version"],
+            },
         }
     )
 
 
+@app.route("/api/scan/stream")
+def api_scan_stream():
+    """
+    Streams the scan as newline-delimited JSON:
+    {"type": "meta", ...}, then one {"type": "item", "item": {...}} per media item
+    as soon as it is matched, then {"type": "end", ...} with stats, disk usage,
+    service statuses and stale sources. Served from the cached snapshot (sorted by
+    title) when there is one, otherwise matched live (in matching order).
+
+    A live scan leads the snapshot build: it stores its matches as the new
+    snapshot, and requests arriving meanwhile (including other streams) wait for
+    it rather than crawling the services again.
+    """
+    config = get_rules_config()
+    force = request.args.get("refresh", "0") not in ("0", "", "false")
+
+    def generate():
+        # Decided here rather than in the view, so a build is only led by a
+        # response that is actually being sent
+        cache = SnapshotCache()
+        snapshot = None if force else cache.get_cached(config)
+        flight = holder = None
+        if snapshot is None:
+            flight, leader = cache.begin_build()
+            if not leader:
+                snapshot = cache.join(flight, config)
+                flight = None
+            else:
+                # Another worker may be refreshing the shared snapshot
+                try:
+                    snapshot, holder = cache.await_shared_build(config)
+                except BaseException:
+                    cache.end_build(flight, error=BuildAborted())
+                    raise
+                if snapshot is not None:
+                    cache.end_build(flight, snapshot)
+                    flight = None
+                else:
+                    SNAPSHOT_BUILDS.inc(result="built")
+                    token = cache.build_token()
+        # A live scan holds the shared refresh lock (if any) until it is stored
+        leading = flight is not None
+
+        meta = {
+            "type": "meta",
+            "config": config,
+            "source": "snapshot" if snapshot is not None else "live",
+        }
+        if snapshot is not None:
+            meta["snapshot"] = {
+                "age": snapshot_age(snapshot),
+                "built_at": snapshot["built_at"],
+            }
+
+        total = eligible = 0
+        try:
+            yield json.dumps(meta) + "\n"
+
+            if snapshot is not None:
+                loaded_media = snapshot["loaded_media"]
+                items = (loaded_media[i] for i in snapshot["orders"]["title"])
+            else:
+                matcher = MatcherService()
+                builder = SnapshotBuilder(cache, config)
+                items = matcher.iter_aggregated_media(config=config)
+
+            for item in items:
+                if snapshot is None:
+                    builder.add(item)
+                    if not item.file_loaded:
+                        continue
+                total += 1
+                if item.deletable:
+                    eligible += 1
+                yield json.dumps({"type": "item", "item": item.to_dict()}) + "\n"
+
+            # Status checks come last rather than delaying the first item
+            if snapshot is None:
+                snapshot = builder.finish(matcher)
+                if cache.store(snapshot, token):
+                    cache.end_build(flight, snapshot)
+                else:
+                    # Invalidated meanwhile: waiting requests build afresh
+                    cache.end_build(flight, error=BuildAborted())
+                flight = None
+        except BaseException:
+            if flight is not None:
+                cache.end_build(flight, error=BuildAborted())
+            raise
+        finally:
+            if leading:
+                cache.release_refresh(holder)
+
+        end = {
+            "type": "end",
+            "config": config,
+            "disk_usage": snapshot["disk_usage"],
+            "services": snapshot["services"],
+            "stale_sources": snapshot["stale_sources"],
+            "stats": {"total": total, "eligible": eligible},
+        }
+        yield json.dumps(end) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
 @app.route("/delete", methods=["POST"])
 def delete_media():
     origin = request.form.get("origin")
@@ -114,25 +423,57 @@ def delete_media():
         f"Received delete request for {origin} ID {media_id} (type={delete_type}) with hashes: {torrent_hashes_str}"
     )
 
-    # Delete Torrents
-    if torrent_hashes_str:
-        qbit = QBitClient()
-        hashes = torrent_hashes_str.split(",")
-        for h in hashes:
-            h = h.strip()
-            if h:
-                qbit.delete_torrent(h)
+    job_id = DeletionJobQueue().submit(
+        [
+            {
+                "origin": origin,
+                "id": media_id,
+                "torrent_hashes": torrent_hashes_str,
+                "delete_type": delete_type,
+            }
+        ]
+    )
+
+    # The dashboard polls the job and refreshes once it is done
+    return redirect(url_for("index", job=job_id))
+
+
+@app.route("/api/delete", methods=["POST"])
+def api_delete():
+    """
+    Bulk delete. Body: {"items": [{"origin", "id", "torrent_hashes", "delete_type"}, ...]}
+    Queues a background job and returns its id; poll /api/jobs/<id> for progress
+    and the per-item result report.
+    """
+    payload = request.get_json(silent=True) or {}
+    items = payload.get("items")
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "Expected a non-empty 'items' list"}), 400
+    for i, item in enumerate(items):
+        error = validate_item(item)
+        if error:
+            return jsonify({"error": f"items[{i}]: {error}"}), 400
+
+    logger.info(f"Received bulk delete request for {len(items)} items")
+    job_id = DeletionJobQueue().submit(items)
+    return (
+        jsonify({"job_id": job_id, "status_url": url_for("api_job", job_id=job_id)}),
+        202,
+    )
 
-    # Delete Media from Radarr/Sonarr only if requested
-    if delete_type == "media":
-        if origin == "Radarr":
-            client = RadarrClient()
-            client.delete_movie(media_id)
-        elif origin == "Sonarr":
-            client = SonarrClient()
-            client.delete_series(media_id)
 
-    return redirect(url_for("index"))
+@app.route("/metrics")
+def metrics():
+    """Prometheus metrics, of every worker process with a shared store."""
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+
+@app.route("/api/jobs/<job_id>")
+def api_job(job_id):
+    job = DeletionJobQueue().get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(job)
 
 
 SETTINGS_TEMPLATE = """
@@ -254,7 +595,19 @@ def settings():
             "MIN_SEED_WEEKS": int(request.form.get("MIN_SEED_WEEKS") or 4),
             "MIN_RATIO": float(request.form.get("MIN_RATIO") or 1.0),
         }
+        # Rule changes are re-evaluated over the cached matches, only new
+        # connection settings need a refetch
+        connection_changed = any(
+            cm.get(key) != value
+            for key, value in new_config.items()
+            if key not in RULE_KEYS
+        )
         cm.update(new_config)
+        if connection_changed:
+            SnapshotCache().invalidate()
+            # Failures of the old settings say nothing about the new ones
+            reset_breakers()
+            HealthMonitor().refresh()
         return redirect(url_for("index"))
 
     return render_template_string(SETTINGS_TEMPLATE, c=cm.get_all())
@@ -0,0 +1,63 @@
+"""
+Compares two benchmark result files written by benchmarks.matcher.
+
+    python -m benchmarks.compare baseline.json candidate.json --threshold 10
+
+Exits with status 1 when a phase got slower than the threshold (percent).
+"""
+
+import argparse
+import json
+import sys
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def change(old, new):
+    if not old:
+        return None
+    return (new - old) / old * 100
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0)
+    args = parser.parse_args(argv)
+
+    baseline, candidate = load(args.baseline), load(args.candidate)
+    if baseline["dataset"] != candidate["dataset"]:
+        print("Warning: the results were measured on different datasets", file=sys.stderr)
+
+    print(f"{baseline.get('revision')} -> {candidate.get('revision')}")
+    print(f"{'phase':<16}{'base s':>10}{'new s':>10}{'time %':>9}{'memory %':>10}")
+    regressions = []
+    for name, new in candidate["phases"].items():
+        old = baseline["phases"].get(name)
+        if old is None:
+            print(f"{name:<16}{'-':>10}{new['wall_s']:>10.3f}")
+            continue
+        time_change = change(old["wall_s"], new["wall_s"])
+        memory_change = None
+        if old.get("peak_bytes") is not None and new.get("peak_bytes") is not None:
+            memory_change = change(old["peak_bytes"], new["peak_bytes"])
+        time_text = f"{time_change:+.1f}" if time_change is not None else "-"
+        memory_text = f"{memory_change:+.1f}" if memory_change is not None else "-"
+        print(
+            f"{name:<16}{old['wall_s']:>10.3f}{new['wall_s']:>10.3f}{time_text:>9}{memory_text:>10}"
+        )
+        if time_change is not None and time_change > args.threshold:
+            regressions.append(name)
+
+    if regressions:
+        print(f"Slower than {args.threshold}%: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,320 @@
+"""
+Matcher benchmark over synthetic libraries.
+
+    python -m benchmarks.matcher --preset medium --repeat 3 --output bench.json
+    python -m benchmarks.matcher --movies 50000 --torrents 100000 --users 50
+
+The real clients are swapped for stubs serving benchmarks.synthetic payloads,
+so no service is contacted and every phase runs the production code: history
+indexing, Jellyfin folding and provider index, qBittorrent table sync, path
+index, matching, rule evaluation, sort orders and a what-if sweep, plus the
+whole MatcherService.get_aggregated_media run.
+
+Wall times are measured without tracing; peak memory comes from a separate
+tracemalloc pass. Results are written as JSON (see benchmarks.compare).
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from benchmarks.synthetic import PRESETS, SyntheticLibrary
+from services.history import HistorySync
+from services.jellyfin import JellyfinClient
+from services.matcher import MatcherService
+from services.media_query import build_sort_index
+from services.path_index import TorrentPathIndex
+from services.qbittorrent import QBitClient, TorrentTable
+from services.radarr import RadarrClient
+from services.rules import DEFAULT_RULES, evaluate_records
+from services.sonarr import SonarrClient
+from services.whatif import parse_axis, sweep
+
+RESULT_FORMAT = 1
+STUB_HOST = "http://synthetic"
+
+
+class StubRadarr(RadarrClient):
+    def __init__(self, library):
+        super().__init__()
+        self.host, self.api_key, self.library = STUB_HOST, "bench", library
+
+    def get_movies(self):
+        return self.library.movies
+
+    def get_history_page(self, page=1, page_size=1000):
+        return self.library.history_page("radarr", page, page_size)
+
+    def get_disk_space(self):
+        return self.library.disk_space()
+
+    def get_root_folders(self):
+        return self.library.root_folders("radarr")
+
+
+class StubSonarr(SonarrClient):
+    def __init__(self, library):
+        super().__init__()
+        self.host, self.api_key, self.library = STUB_HOST, "bench", library
+
+    def get_series(self):
+        return self.library.series
+
+    def get_history_page(self, page=1, page_size=1000):
+        return self.library.history_page("sonarr", page, page_size)
+
+    def get_disk_space(self):
+        return self.library.disk_space()
+
+    def get_root_folders(self):
+        return self.library.root_folders("sonarr")
+
+
+class StubQBit(QBitClient):
+    def __init__(self, library):
+        super().__init__()
+        self.host, self.library = STUB_HOST, library
+
+    def sync_torrents(self):
+        table = TorrentTable()
+        table.apply(self.library.maindata())
+        return table.values()
+
+    def get_torrents(self):
+        return self.sync_torrents()
+
+
+class StubJellyfin(JellyfinClient):
+    def __init__(self, library):
+        super().__init__()
+        self.host, self.api_key, self.library = STUB_HOST, "bench", library
+
+    def get_users(self):
+        self.users = self.library.users
+        return self.users
+
+    def iter_user_item_pages(self, user_id, page_size=1000):
+        start = 0
+        while True:
+            page = self.library.user_items_page(user_id, start, page_size)
+            if not page["Items"]:
+                return
+            yield page["Items"]
+            start += len(page["Items"])
+
+
+def reset_history():
+    """Drops in-memory and persisted history indexes so each run does a full sync."""
+    HistorySync._states.clear()
+    shutil.rmtree("config", ignore_errors=True)
+
+
+def stub_matcher(library):
+    matcher = MatcherService()
+    matcher.radarr = StubRadarr(library)
+    matcher.sonarr = StubSonarr(library)
+    matcher.qbit = StubQBit(library)
+    matcher.jellyfin = StubJellyfin(library)
+    matcher.radarr_history = HistorySync("radarr", matcher.radarr, "movieId")
+    matcher.sonarr_history = HistorySync("sonarr", matcher.sonarr, "seriesId")
+    return matcher
+
+
+def run_phases(library, rules):
+    """
+    Runs every phase once, in dependency order. Yields (name, callable) so the
+    caller can time each call; callables receive the results of earlier phases.
+    """
+    matcher = stub_matcher(library)
+    state = {}
+
+    def history():
+        reset_history()
+        state["radarr_history"] = matcher.radarr_history.sync()
+        state["sonarr_history"] = matcher.sonarr_history.sync()
+
+    def jellyfin():
+        state["jellyfin"] = matcher.jellyfin.get_provider_index()
+
+    def qbit_sync():
+        state["qbit_torrents"] = matcher.qbit.sync_torrents()
+
+    def path_index():
+        TorrentPathIndex(state["qbit_torrents"])
+
+    def match():
+        sources = {
+            "radarr_movies": library.movies,
+            "sonarr_series": library.series,
+            "radarr_history": state["radarr_history"],
+            "sonarr_history": state["sonarr_history"],
+            "qbit_torrents": state["qbit_torrents"],
+            "jellyfin": state["jellyfin"],
+        }
+        state["matched"] = list(matcher._match_sources(sources))
+
+    def rules_pass():
+        state["disk_usage"] = matcher.get_disk_usage()
+        state["media"] = evaluate_records(state["matched"], rules, state["disk_usage"])
+
+    def sort_index():
+        build_sort_index([r for r in state["media"] if r.file_loaded])
+
+    def whatif():
+        axes = {
+            "min_ratio": parse_axis({"start": 0, "stop": 3, "step": 0.1}, None),
+            "min_seed_weeks": parse_axis({"start": 0, "stop": 26, "step": 1}, None),
+            "disk_threshold": parse_axis({"start": 50, "stop": 100, "step": 5}, None),
+        }
+        sweep(state["media"], state["disk_usage"], axes)
+
+    def end_to_end():
+        reset_history()
+        stub_matcher(library).get_aggregated_media(config=rules)
+
+    yield "history_index", history
+    yield "jellyfin_index", jellyfin
+    yield "qbit_table", qbit_sync
+    yield "path_index", path_index
+    yield "match", match
+    yield "rules", rules_pass
+    yield "sort_index", sort_index
+    yield "whatif_sweep", whatif
+    yield "end_to_end", end_to_end
+
+
+def time_phases(library, rules, repeat):
+    runs = {}
+    for _ in range(repeat):
+        for name, phase in run_phases(library, rules):
+            started = time.perf_counter()
+            phase()
+            runs.setdefault(name, []).append(time.perf_counter() - started)
+    return runs
+
+
+def measure_memory(library, rules):
+    """Peak traced allocation of each phase, above what was live before it."""
+    peaks = {}
+    tracemalloc.start()
+    try:
+        for name, phase in run_phases(library, rules):
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            phase()
+            peaks[name] = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            capture_output=True,
+            text=True,
+            timeout=10,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small")
+    parser.add_argument("--movies", type=int)
+    parser.add_argument("--series", type=int)
+    parser.add_argument("--torrents", type=int)
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--output", help="write JSON results to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    sizes = dict(PRESETS[args.preset])
+    for key in sizes:
+        if getattr(args, key) is not None:
+            sizes[key] = getattr(args, key)
+
+    output = os.path.abspath(args.output) if args.output else None
+    workdir = tempfile.mkdtemp(prefix="media-cleanerr-bench-")
+    os.chdir(workdir)  # history indexes and settings stay out of the repo
+    try:
+        started = time.perf_counter()
+        library = SyntheticLibrary(seed=args.seed, **sizes)
+        generate_s = time.perf_counter() - started
+        print(
+            f"Generated {len(library.movies)} movies, {len(library.series)} series, "
+            f"{len(library.torrents)} torrents, {len(library.users)} users "
+            f"in {generate_s:.2f}s",
+            file=sys.stderr,
+        )
+
+        rules = dict(DEFAULT_RULES)
+        runs = time_phases(library, rules, max(1, args.repeat))
+        peaks = {} if args.no_memory else measure_memory(library, rules)
+    finally:
+        os.chdir("/")
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    phases = {
+        name: {
+            "wall_s": statistics.median(times),
+            "min_s": min(times),
+            "runs_s": times,
+            "peak_bytes": peaks.get(name),
+        }
+        for name, times in runs.items()
+    }
+    result = {
+        "format": RESULT_FORMAT,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {**library.params, "preset": args.preset, "repeat": args.repeat},
+        "dataset": {
+            "movies": len(library.movies),
+            "series": len(library.series),
+            "torrents": len(library.torrents),
+            "users": len(library.users),
+            "jellyfin_items": len(library.jellyfin_items),
+            "radarr_history": len(library.radarr_history),
+            "sonarr_history": len(library.sonarr_history),
+        },
+        "phases": phases,
+    }
+
+    print(f"{'phase':<16}{'median s':>10}{'min s':>10}{'peak MiB':>10}")
+    for name, phase in phases.items():
+        peak = phase["peak_bytes"]
+        peak_text = f"{peak / 2**20:.1f}" if peak is not None else "-"
+        print(f"{name:<16}{phase['wall_s']:>10.3f}{phase['min_s']:>10.3f}{peak_text:>10}")
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"Results written to {output}", file=sys.stderr)
+    return result
+
+
+if __name__ == "__main__":
+    main()
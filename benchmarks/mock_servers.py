@@ -0,0 +1,373 @@
+"""
+Local stand-ins for Radarr, Sonarr, qBittorrent and Jellyfin.
+
+    python -m benchmarks.mock_servers --preset medium --latency-ms 40 --error-rate 0.01
+
+Each service runs its own HTTP server on its usual port and serves a
+benchmarks.synthetic library through the endpoints the clients use. Every
+request can be delayed (latency plus random jitter) and fail with a 500 at a
+given rate, and --pad-bytes inflates each movie, series and Jellyfin item to
+approach real payload sizes. Deletions are applied to the library, so a
+load test sees them on the next scan.
+
+Point the app at the mocks with the environment printed on startup, or use
+start_mock_servers() from a load test.
+"""
+
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+
+from flask import Flask, Response, abort, request
+from werkzeug.serving import make_server
+
+from benchmarks.synthetic import PRESETS, SyntheticLibrary
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORTS = {"radarr": 7878, "sonarr": 8989, "qbittorrent": 8080, "jellyfin": 8096}
+API_KEY = "mock-api-key"
+QBIT_SID = "mock-sid"
+
+
+class MockOptions:
+    def __init__(self, latency_ms=0, jitter_ms=0, error_rate=0.0, api_key=API_KEY):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.api_key = api_key
+
+
+class MockState:
+    """The served library, with cached JSON bodies and the qBittorrent sync id."""
+
+    def __init__(self, library):
+        self.library = library
+        self.lock = threading.Lock()
+        self.rid = 1
+        self._bodies = {}
+
+    def body(self, name, build):
+        body = self._bodies.get(name)
+        if body is None:
+            body = json.dumps(build())
+            self._bodies[name] = body
+        return body
+
+    def delete_media(self, kind, ids):
+        ids = set(ids)
+        with self.lock:
+            if kind == "movies":
+                self.library.movies = [m for m in self.library.movies if m["id"] not in ids]
+            else:
+                self.library.series = [s for s in self.library.series if s["id"] not in ids]
+            self._bodies.pop(kind, None)
+
+    def delete_torrents(self, hashes):
+        with self.lock:
+            self.library.delete_torrents(hashes)
+            self.rid += 1
+            self._bodies.pop("torrents", None)
+
+
+def pad_payloads(library, pad_bytes):
+    """Adds an overview of pad_bytes to every movie, series and Jellyfin item."""
+    if pad_bytes <= 0:
+        return
+    overview = "x" * pad_bytes
+    for item in library.movies + library.series + library.jellyfin_items:
+        item["overview"] = overview
+
+
+def json_response(body, status=200):
+    if not isinstance(body, str):
+        body = json.dumps(body)
+    return Response(body, status=status, mimetype="application/json")
+
+
+def _create_app(name, options):
+    app = Flask(f"mock-{name}")
+
+    @app.before_request
+    def simulate_conditions():
+        delay = options.latency_ms + random.uniform(0, options.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+        if options.error_rate and random.random() < options.error_rate:
+            abort(500)
+
+    return app
+
+
+def _require_api_key(options, header="X-Api-Key"):
+    if request.headers.get(header) != options.api_key:
+        abort(401)
+
+
+def create_arr_app(state, options, service):
+    """Radarr (service="radarr") or Sonarr (service="sonarr") API v3."""
+    app = _create_app(service, options)
+    library = state.library
+    kind = "movies" if service == "radarr" else "series"
+    resource = "movie" if service == "radarr" else "series"
+    ids_key = "movieIds" if service == "radarr" else "seriesIds"
+
+    @app.before_request
+    def check_api_key():
+        _require_api_key(options)
+
+    @app.get(f"/api/v3/{resource}")
+    def list_media():
+        return json_response(state.body(kind, lambda: getattr(library, kind)))
+
+    @app.delete(f"/api/v3/{resource}/editor")
+    def bulk_delete():
+        payload = request.get_json(silent=True) or {}
+        state.delete_media(kind, payload.get(ids_key) or [])
+        return json_response({})
+
+    @app.delete(f"/api/v3/{resource}/<int:media_id>")
+    def delete(media_id):
+        state.delete_media(kind, [media_id])
+        return json_response({})
+
+    @app.get("/api/v3/history")
+    def history():
+        page = request.args.get("page", 1, type=int)
+        page_size = request.args.get("pageSize", 10, type=int)
+        descending = request.args.get("sortDirection", "descending") == "descending"
+        return json_response(
+            library.history_page(service, page, page_size, descending=descending)
+        )
+
+    @app.get("/api/v3/diskspace")
+    def disk_space():
+        return json_response(library.disk_space())
+
+    @app.get("/api/v3/rootfolder")
+    def root_folders():
+        return json_response(library.root_folders(service))
+
+    @app.get("/api/v3/system/status")
+    def system_status():
+        return json_response({"appName": service.capitalize(), "version": "0.0.0-mock"})
+
+    if service == "sonarr":
+
+        @app.get("/api/v3/episode")
+        def episodes():
+            series_id = request.args.get("seriesId", type=int)
+            show = next((s for s in library.series if s["id"] == series_id), None)
+            if show is None:
+                return json_response([])
+            count = show["statistics"]["episodeCount"]
+            return json_response(
+                [
+                    {
+                        "id": series_id * 1000 + i,
+                        "seriesId": series_id,
+                        "seasonNumber": i // 10 + 1,
+                        "episodeNumber": i % 10 + 1,
+                        "hasFile": i < show["statistics"]["episodeFileCount"],
+                    }
+                    for i in range(count)
+                ]
+            )
+
+    return app
+
+
+def create_qbit_app(state, options, username="admin", password="adminadmin"):
+    """qBittorrent Web API v2."""
+    app = _create_app("qbittorrent", options)
+    library = state.library
+
+    @app.before_request
+    def check_session():
+        if request.path != "/api/v2/auth/login" and request.cookies.get("SID") != QBIT_SID:
+            abort(403)
+
+    @app.post("/api/v2/auth/login")
+    def login():
+        if (
+            request.form.get("username") != username
+            or request.form.get("password") != password
+        ):
+            return Response("Fails.", mimetype="text/plain")
+        response = Response("Ok.", mimetype="text/plain")
+        response.set_cookie("SID", QBIT_SID)
+        return response
+
+    @app.get("/api/v2/app/version")
+    def version():
+        return Response("v4.6.0-mock", mimetype="text/plain")
+
+    @app.get("/api/v2/torrents/info")
+    def torrents_info():
+        return json_response(state.body("torrents", lambda: library.torrents))
+
+    @app.get("/api/v2/sync/maindata")
+    def maindata():
+        # Up to date clients get an empty delta, any other rid a full update
+        rid = request.args.get("rid", 0, type=int)
+        if rid == state.rid:
+            return json_response({"rid": state.rid})
+        return json_response(dict(library.maindata(), rid=state.rid))
+
+    @app.post("/api/v2/torrents/delete")
+    def delete():
+        hashes = [h for h in request.form.get("hashes", "").split("|") if h]
+        state.delete_torrents(hashes)
+        return Response("", mimetype="text/plain")
+
+    return app
+
+
+def create_jellyfin_app(state, options):
+    app = _create_app("jellyfin", options)
+    library = state.library
+
+    @app.before_request
+    def check_token():
+        _require_api_key(options, header="X-Emby-Token")
+
+    @app.get("/Users")
+    def users():
+        return json_response(library.users)
+
+    @app.get("/Users/<user_id>/Items")
+    def user_items(user_id):
+        if not any(user["Id"] == user_id for user in library.users):
+            abort(404)
+        start = request.args.get("StartIndex", 0, type=int)
+        limit = request.args.get("Limit", type=int)
+        return json_response(library.user_items_page(user_id, start, limit))
+
+    @app.get("/System/Info")
+    def system_info():
+        return json_response({"ServerName": "mock", "Version": "10.8.0-mock"})
+
+    return app
+
+
+class MockServers:
+    """Running mock servers, one thread each."""
+
+    def __init__(self, servers, host):
+        self.servers = servers
+        self.host = host
+        self.threads = []
+
+    def start(self):
+        for name, server in self.servers.items():
+            thread = threading.Thread(
+                target=server.serve_forever, name=f"mock-{name}", daemon=True
+            )
+            thread.start()
+            self.threads.append(thread)
+        return self
+
+    def stop(self):
+        for server in self.servers.values():
+            server.shutdown()
+
+    def url(self, name):
+        return f"http://{self.host}:{self.servers[name].server_port}"
+
+    def settings(self, options):
+        """ConfigManager settings (or environment variables) pointing at the mocks."""
+        return {
+            "RADARR_HOST": self.url("radarr"),
+            "RADARR_API_KEY": options.api_key,
+            "SONARR_HOST": self.url("sonarr"),
+            "SONARR_API_KEY": options.api_key,
+            "QBIT_HOST": self.url("qbittorrent"),
+            "QBIT_USERNAME": "admin",
+            "QBIT_PASSWORD": "adminadmin",
+            "JELLYFIN_HOST": self.url("jellyfin"),
+            "JELLYFIN_API_KEY": options.api_key,
+        }
+
+
+def start_mock_servers(library, options=None, host="127.0.0.1", ports=None):
+    """
+    Serves `library` on all four mock services and returns the started
+    MockServers. A port of 0 picks a free port.
+    """
+    options = options or MockOptions()
+    ports = {**DEFAULT_PORTS, **(ports or {})}
+    state = MockState(library)
+    apps = {
+        "radarr": create_arr_app(state, options, "radarr"),
+        "sonarr": create_arr_app(state, options, "sonarr"),
+        "qbittorrent": create_qbit_app(state, options),
+        "jellyfin": create_jellyfin_app(state, options),
+    }
+    servers = {
+        name: make_server(host, ports[name], app, threaded=True)
+        for name, app in apps.items()
+    }
+    return MockServers(servers, host).start()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small")
+    parser.add_argument("--movies", type=int)
+    parser.add_argument("--series", type=int)
+    parser.add_argument("--torrents", type=int)
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--host", default="127.0.0.1")
+    for name, port in DEFAULT_PORTS.items():
+        parser.add_argument(f"--{name}-port", type=int, default=port)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--pad-bytes", type=int, default=0)
+    parser.add_argument("--api-key", default=API_KEY)
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    if not args.verbose:
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    sizes = dict(PRESETS[args.preset])
+    for key in sizes:
+        if getattr(args, key) is not None:
+            sizes[key] = getattr(args, key)
+    library = SyntheticLibrary(seed=args.seed, **sizes)
+    pad_payloads(library, args.pad_bytes)
+
+    options = MockOptions(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        api_key=args.api_key,
+    )
+    ports = {name: getattr(args, f"{name}_port") for name in DEFAULT_PORTS}
+    servers = start_mock_servers(library, options, host=args.host, ports=ports)
+
+    logger.info(
+        f"Serving {len(library.movies)} movies, {len(library.series)} series, "
+        f"{len(library.torrents)} torrents and {len(library.users)} users."
+    )
+    for key, value in servers.settings(options).items():
+        print(f"{key}={value}")
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        servers.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""
+Synthetic Radarr, Sonarr, qBittorrent and Jellyfin payloads.
+
+The payloads mirror the fields the clients read from the real APIs, with
+realistic proportions: most movies and seasons have a torrent, most of them
+are found through history (the others only by path), some history points at
+torrents that are gone, and the rest of the torrents are unrelated to the
+library. Everything is derived from `seed`, so a size and seed always give
+the same library.
+"""
+
+import random
+import zlib
+
+MOVIE_ROOT = "/media/movies"
+SERIES_ROOT = "/media/tv"
+TORRENT_STATES = ("uploading", "stalledUP", "pausedUP", "queuedUP", "forcedUP")
+EPISODES_PER_SEASON = 10
+WEEK_SECONDS = 7 * 24 * 3600
+
+PRESETS = {
+    "small": {"movies": 1000, "series": 300, "torrents": 3000, "users": 5},
+    "medium": {"movies": 10000, "series": 2000, "torrents": 25000, "users": 20},
+    "large": {"movies": 50000, "series": 8000, "torrents": 100000, "users": 50},
+}
+
+
+class SyntheticLibrary:
+    def __init__(
+        self,
+        movies=1000,
+        series=300,
+        torrents=3000,
+        users=5,
+        seed=42,
+        watch_rate=0.4,
+    ):
+        self.params = {
+            "movies": movies,
+            "series": series,
+            "torrents": torrents,
+            "users": users,
+            "seed": seed,
+            "watch_rate": watch_rate,
+        }
+        self.watch_rate = watch_rate
+        self._rnd = random.Random(seed)
+
+        self.movies = []
+        self.series = []
+        self.torrents = []
+        self.radarr_history = []
+        self.sonarr_history = []
+        self.jellyfin_items = []
+        self.users = [
+            {"Id": f"{self._rnd.getrandbits(128):032x}", "Name": f"user{i}"}
+            for i in range(users)
+        ]
+
+        self._generate_movies(movies)
+        self._generate_series(series)
+        self._generate_filler_torrents(torrents - len(self.torrents))
+        self._torrents_by_hash = {t["hash"]: t for t in self.torrents}
+
+    @classmethod
+    def from_preset(cls, name, **overrides):
+        return cls(**{**PRESETS[name], **overrides})
+
+    # --- Generation ---
+
+    def _hash(self):
+        return f"{self._rnd.getrandbits(160):040x}"
+
+    def _torrent(self, name, content_path, size):
+        rnd = self._rnd
+        torrent = {
+            "hash": self._hash(),
+            "name": name,
+            "state": rnd.choice(TORRENT_STATES),
+            "ratio": round(rnd.expovariate(1.0), 4),
+            "seeding_time": int(rnd.uniform(0, 26 * WEEK_SECONDS)),
+            "content_path": content_path,
+            "save_path": content_path.rsplit("/", 1)[0],
+            "size": size,
+            "category": "",
+            "added_on": 1600000000 + rnd.randint(0, 10**8),
+        }
+        self.torrents.append(torrent)
+        return torrent
+
+    def _history(self, records, media_key, media_id, download_id, episode=None):
+        record = {
+            "id": len(records) + 1,
+            media_key: media_id,
+            "downloadId": download_id.upper(),
+            "eventType": "grabbed",
+            "date": "2024-01-01T00:00:00Z",
+        }
+        if episode:
+            record["episode"] = episode
+        records.append(record)
+
+    def _jellyfin_item(self, item_type, name, path, provider_ids):
+        self.jellyfin_items.append(
+            {
+                "Id": f"{self._rnd.getrandbits(128):032x}",
+                "Name": name,
+                "Type": item_type,
+                "Path": path,
+                "ProviderIds": provider_ids,
+            }
+        )
+
+    def _generate_movies(self, count):
+        rnd = self._rnd
+        for movie_id in range(1, count + 1):
+            title = f"Synthetic Movie {movie_id}"
+            year = rnd.randint(1960, 2024)
+            path = f"{MOVIE_ROOT}/{title} ({year})"
+            has_file = rnd.random() < 0.9
+            size = rnd.randint(700 * 2**20, 60 * 2**30) if has_file else 0
+            movie = {
+                "id": movie_id,
+                "title": title,
+                "year": year,
+                "path": path,
+                "hasFile": has_file,
+                "monitored": rnd.random() < 0.85,
+                "tmdbId": 100000 + movie_id,
+                "imdbId": f"tt{9000000 + movie_id}",
+                "sizeOnDisk": size,
+            }
+            self.movies.append(movie)
+
+            if has_file and rnd.random() < 0.85:
+                # Half the torrents seed from the library folder (path match),
+                # the others from a download folder (history match only)
+                if rnd.random() < 0.5:
+                    content_path = f"{path}/{title}.mkv"
+                else:
+                    content_path = f"/downloads/movies/{title} ({year})/{title}.mkv"
+                torrent = self._torrent(f"{title} ({year}) 1080p", content_path, size)
+                if rnd.random() < 0.75:
+                    self._history(
+                        self.radarr_history, "movieId", movie_id, torrent["hash"]
+                    )
+            if rnd.random() < 0.1:
+                # Grab whose torrent was removed since
+                self._history(self.radarr_history, "movieId", movie_id, self._hash())
+
+            if has_file:
+                provider_ids = {"Tmdb": str(movie["tmdbId"]), "Imdb": movie["imdbId"]}
+                self._jellyfin_item("Movie", title, path, provider_ids)
+                if rnd.random() < 0.03:
+                    # Second version of the same movie
+                    self._jellyfin_item("Movie", title, f"{path} - 4K", provider_ids)
+
+    def _generate_series(self, count):
+        rnd = self._rnd
+        for series_id in range(1, count + 1):
+            title = f"Synthetic Show {series_id}"
+            path = f"{SERIES_ROOT}/{title}"
+            seasons = rnd.randint(1, 8)
+            episode_count = seasons * EPISODES_PER_SEASON
+            roll = rnd.random()
+            if roll < 0.7:
+                file_count = episode_count
+            elif roll < 0.9:
+                file_count = rnd.randint(1, episode_count)
+            else:
+                file_count = 0
+            season_size = rnd.randint(2 * 2**30, 40 * 2**30)
+            show = {
+                "id": series_id,
+                "title": title,
+                "year": rnd.randint(1990, 2024),
+                "path": path,
+                "monitored": rnd.random() < 0.85,
+                "tvdbId": 300000 + series_id,
+                "statistics": {
+                    "episodeCount": episode_count,
+                    "episodeFileCount": file_count,
+                    "sizeOnDisk": season_size * file_count // EPISODES_PER_SEASON,
+                },
+            }
+            self.series.append(show)
+
+            for season in range(1, seasons + 1):
+                if file_count == 0 or rnd.random() > 0.7:
+                    continue
+                name = f"Synthetic.Show.{series_id}.S{season:02d}.1080p.WEB"
+                if rnd.random() < 0.5:
+                    content_path = f"{path}/Season {season}"
+                else:
+                    content_path = f"/downloads/tv/{name}"
+                torrent = self._torrent(name, content_path, season_size)
+                if rnd.random() < 0.75:
+                    for episode in range(1, EPISODES_PER_SEASON + 1):
+                        self._history(
+                            self.sonarr_history,
+                            "seriesId",
+                            series_id,
+                            torrent["hash"],
+                            {"seasonNumber": season, "episodeNumber": episode},
+                        )
+
+            if file_count:
+                self._jellyfin_item(
+                    "Series", title, path, {"Tvdb": str(show["tvdbId"])}
+                )
+
+    def _generate_filler_torrents(self, count):
+        for i in range(max(0, count)):
+            name = f"Unrelated.Download.{i}"
+            self._torrent(
+                name, f"/downloads/other/{name}", self._rnd.randint(2**20, 2**32)
+            )
+
+    # --- API shaped views ---
+
+    def history_page(self, service, page=1, page_size=1000, descending=True):
+        """A Radarr/Sonarr /api/v3/history page, ordered by record id."""
+        records = self.radarr_history if service == "radarr" else self.sonarr_history
+        total = len(records)
+        start = (page - 1) * page_size
+        stop = min(start + page_size, total)
+        if descending:
+            page_records = [records[total - 1 - i] for i in range(start, stop)]
+        else:
+            page_records = records[start:stop]
+        return {
+            "page": page,
+            "pageSize": page_size,
+            "sortKey": "id",
+            "sortDirection": "descending" if descending else "ascending",
+            "totalRecords": total,
+            "records": page_records,
+        }
+
+    def is_played(self, user_id, item_id):
+        # Stable per user and item, independent of generation order
+        return zlib.crc32(f"{user_id}:{item_id}".encode()) % 1000 < self.watch_rate * 1000
+
+    def user_items_page(self, user_id, start=0, limit=None):
+        """A Jellyfin /Users/{id}/Items page, built on demand to keep memory flat."""
+        total = len(self.jellyfin_items)
+        stop = total if limit is None else min(start + limit, total)
+        items = [
+            dict(item, UserData={"Played": self.is_played(user_id, item["Id"])})
+            for item in self.jellyfin_items[start:stop]
+        ]
+        return {"Items": items, "TotalRecordCount": total, "StartIndex": start}
+
+    def maindata(self):
+        """A full qBittorrent /api/v2/sync/maindata update."""
+        return {
+            "rid": 1,
+            "full_update": True,
+            "torrents": {
+                t["hash"]: {k: v for k, v in t.items() if k != "hash"}
+                for t in self.torrents
+            },
+        }
+
+    def get_torrent(self, torrent_hash):
+        return self._torrents_by_hash.get(torrent_hash.lower())
+
+    def delete_torrents(self, hashes):
+        hashes = {h.lower() for h in hashes}
+        self.torrents = [t for t in self.torrents if t["hash"] not in hashes]
+        self._torrents_by_hash = {t["hash"]: t for t in self.torrents}
+
+    def disk_space(self):
+        total = 16 * 2**40
+        return [
+            {"path": "/", "label": "root", "freeSpace": 40 * 2**30, "totalSpace": 100 * 2**30},
+            {"path": "/media", "label": "media", "freeSpace": total // 10, "totalSpace": total},
+        ]
+
+    def root_folders(self, service):
+        path = MOVIE_ROOT if service == "radarr" else SERIES_ROOT
+        return [{"id": 1, "path": path, "accessible": True, "freeSpace": 16 * 2**40 // 10}]
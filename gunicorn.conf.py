@@ -0,0 +1,65 @@
+"""
+Production serving: gunicorn --config gunicorn.conf.py app:app
+
+Workers are separate processes, so they share the scan snapshot and deletion
+jobs through the SQLite store at SNAPSHOT_STORE (services.shared_store): one
+worker refreshes the snapshot at a time and the others load it from the store.
+/metrics sums the metrics of all workers (services.shared_metrics), and a
+single worker probes the services' health for all of them.
+"""
+
+import os
+
+os.environ.setdefault("SNAPSHOT_STORE", "config/snapshot.db")
+
+bind = os.getenv("BIND", "0.0.0.0:5000")
+workers = int(os.getenv("WEB_CONCURRENCY", 2))
+# Threads serve streamed scans and requests waiting on a snapshot build
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", 8))
+# A live scan streams for up to about FETCH_DEADLINE
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 180))
+graceful_timeout = 30
+accesslog = "-"
+# Each worker imports the app itself, so no client session or thread is
+# shared across the fork
+preload_app = False
+
+
+def on_starting(server):
+    # No worker runs yet: jobs left queued or running were interrupted, and
+    # locks, metrics and health results belong to the previous run
+    from services.shared_store import get_store
+
+    store = get_store()
+    if store is None:
+        server.log.warning(
+            "SNAPSHOT_STORE is empty: workers will not share snapshots, jobs or metrics."
+        )
+    else:
+        interrupted = store.interrupt_jobs()
+        if interrupted:
+            server.log.info(f"Marked {interrupted} unfinished deletion jobs interrupted.")
+        store.clear_locks()
+        store.clear_metrics()
+        store.clear_state()
+
+
+def post_worker_init(worker):
+    from services.health import HealthMonitor
+    from services.shared_metrics import MetricsPublisher
+
+    MetricsPublisher().start()
+    HealthMonitor().start()
+
+
+def child_exit(server, worker):
+    # Its counters still count, its gauges no longer apply. Its leases (health
+    # prober, snapshot refresh) are released so another worker takes over now
+    # rather than when they expire.
+    from services.shared_store import get_store
+
+    store = get_store()
+    if store is not None:
+        store.mark_worker_dead(worker.pid)
+        store.release_worker_locks(worker.pid)
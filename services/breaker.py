@@ -0,0 +1,126 @@
+"""
+Per-service circuit breakers, enforced by the session adapter (services.http).
+
+closed:    requests go through; FAILURE_THRESHOLD consecutive failures (connection
+           errors, timeouts or 5xx responses) open the circuit.
+open:      requests fail fast with CircuitOpenError until the backoff expires.
+half_open: a single trial request goes through. Success closes the circuit,
+           failure reopens it with twice the backoff (up to BREAKER_MAX_BACKOFF).
+"""
+
+import logging
+import threading
+import time
+
+import requests
+
+from services.config_manager import ConfigManager
+from services.metrics import CIRCUIT_STATE, CIRCUIT_TRANSITIONS
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised instead of sending a request to a service known to be down."""
+
+
+class CircuitBreaker:
+    def __init__(self, service):
+        self.service = service
+        self.state = CLOSED
+        self.failures = 0
+        self.backoff = 0.0
+        self.retry_at = 0.0
+        self.changed_at = time.time()
+        self._trial_running = False
+        self._lock = threading.Lock()
+        CIRCUIT_STATE.set(STATE_VALUES[CLOSED], service=service)
+
+    def _set_state(self, state):
+        if state == self.state:
+            return
+        logger.info(f"Circuit for {self.service} is now {state} (was {self.state}).")
+        self.state = state
+        self.changed_at = time.time()
+        CIRCUIT_STATE.set(STATE_VALUES[state], service=self.service)
+        CIRCUIT_TRANSITIONS.inc(service=self.service, state=state)
+
+    def allow(self):
+        """Whether a request may be sent now. Starts the half-open trial when due."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if time.monotonic() < self.retry_at:
+                    return False
+                self._set_state(HALF_OPEN)
+            if self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.backoff = 0.0
+            self._trial_running = False
+            self._set_state(CLOSED)
+
+    def record_failure(self):
+        cm = ConfigManager()
+        threshold = int(cm.get("BREAKER_FAILURES", 3))
+        base = float(cm.get("BREAKER_BACKOFF", 5))
+        cap = float(cm.get("BREAKER_MAX_BACKOFF", 300))
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == HALF_OPEN:
+                self.backoff = min(self.backoff * 2 or base, cap)
+            elif self.state == CLOSED and self.failures >= threshold:
+                self.backoff = base
+            else:
+                return
+            self.retry_at = time.monotonic() + self.backoff
+            self._set_state(OPEN)
+
+    def reset(self):
+        with self._lock:
+            self.failures = 0
+            self.backoff = 0.0
+            self._trial_running = False
+            self._set_state(CLOSED)
+
+    def to_dict(self):
+        with self._lock:
+            retry_in = max(0.0, self.retry_at - time.monotonic()) if self.state == OPEN else 0.0
+            return {
+                "state": self.state,
+                "failures": self.failures,
+                "backoff": self.backoff,
+                "retry_in": round(retry_in, 1),
+                "changed_at": self.changed_at,
+            }
+
+
+def get_breaker(service):
+    with _breakers_lock:
+        breaker = _breakers.get(service)
+        if breaker is None:
+            breaker = _breakers[service] = CircuitBreaker(service)
+        return breaker
+
+
+def reset_breakers():
+    """Closes every circuit, e.g. after the connection settings changed."""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    for breaker in breakers:
+        breaker.reset()
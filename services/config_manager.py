@@ -7,9 +7,50 @@ logger = logging.getLogger(__name__)
 CONFIG_FILE = "config/settings.json"
 
 
+def _is_true(value):
+    return value.lower() == "true"
+
+
+def _is_not_false(value):
+    return value.lower() != "false"
+
+
+# Tuning knobs: key -> (parser, default). They are read from the environment
+# on every get() and never saved to CONFIG_FILE, so changing the environment
+# takes effect on restart even once the settings were saved.
+TUNING = {
+    # Scan tuning
+    "FETCH_WORKERS": (int, 7),
+    "FETCH_DEADLINE": (float, 90),
+    "RADARR_FETCH_BUDGET": (float, 30),
+    "SONARR_FETCH_BUDGET": (float, 30),
+    "QBIT_FETCH_BUDGET": (float, 20),
+    "JELLYFIN_FETCH_BUDGET": (float, 45),
+    "HISTORY_PAGE_SIZE": (int, 1000),
+    "QBIT_SYNC": (_is_not_false, True),
+    "SCAN_CACHE_TTL": (float, 300),
+    "DISK_USAGE_TTL": (float, 60),
+    "HEALTH_INTERVAL": (float, 30),
+    "BREAKER_FAILURES": (int, 3),
+    "BREAKER_BACKOFF": (float, 5),
+    "BREAKER_MAX_BACKOFF": (float, 300),
+    "JELLYFIN_WORKERS": (int, 4),
+    "JELLYFIN_PAGE_SIZE": (int, 1000),
+    "HTTP_POOL_SIZE": (int, 10),
+    "DELETE_WORKERS": (int, 2),
+    "DELETE_BATCH_SIZE": (int, 25),
+    "COMPRESS_MIN_SIZE": (int, 1024),
+    "PROFILE_SCANS": (_is_true, False),
+    "METRICS_INTERVAL": (float, 5),
+    # Multi-worker serving (see gunicorn.conf.py)
+    "SNAPSHOT_STORE": (str, ""),
+}
+
+
 class ConfigManager:
     _instance = None
     _config = {}
+    _mtime = None
 
     def __new__(cls):
         if cls._instance is None:
@@ -21,8 +62,11 @@ class ConfigManager:
         # Load from file if exists
         if os.path.exists(CONFIG_FILE):
             try:
+                self._mtime = os.path.getmtime(CONFIG_FILE)
                 with open(CONFIG_FILE, "r") as f:
-                    self._config = json.load(f)
+                    config = json.load(f)
+                # Tuning saved by earlier versions would shadow the environment
+                self._config = {k: v for k, v in config.items() if k not in TUNING}
             except Exception as e:
                 logger.error(f"Failed to load config file: {e}")
 
@@ -43,9 +87,42 @@ class ConfigManager:
             if key not in self._config:
                 self._config[key] = value
 
+    def reload_if_changed(self):
+        """
+        Reloads the settings file if it changed since it was last read or
+        written, e.g. saved by another worker process. Returns the keys whose
+        value changed.
+        """
+        try:
+            mtime = os.path.getmtime(CONFIG_FILE)
+        except OSError:
+            return set()
+        if mtime == self._mtime:
+            return set()
+        previous = dict(self._config)
+        self.load_config()
+        return {
+            key
+            for key in set(previous) | set(self._config)
+            if previous.get(key) != self._config.get(key)
+        }
+
     def get(self, key, default=None):
+        if key in TUNING and key not in self._config:
+            return self._tuning(key)
         return self._config.get(key, default)
 
+    def _tuning(self, key):
+        parse, default = TUNING[key]
+        value = os.getenv(key)
+        if value is None or value == "":
+            return default
+        try:
+            return parse(value)
+        except ValueError:
+            logger.warning(f"Invalid {key}={value!r} in the environment, using {default}.")
+            return default
+
     def set(self, key, value):
         self._config[key] = value
         self.save_config()
@@ -58,7 +135,10 @@ class ConfigManager:
         try:
             os.makedirs(os.path.dirname(CONFIG_FILE), exist_ok=True)
             with open(CONFIG_FILE, "w") as f:
-                json.dump(self._config, f, indent=4)
+                # Tuning set at runtime lasts until restart, like the environment
+                saved = {k: v for k, v in self._config.items() if k not in TUNING}
+                json.dump(saved, f, indent=4)
+            self._mtime = os.path.getmtime(CONFIG_FILE)
         except Exception as e:
             logger.error(f"Failed to save config file: {e}")
 
@@ -0,0 +1,139 @@
+import logging
+
+from services.http import get_client
+from services.metrics import DELETED_ITEMS
+from services.qbittorrent import QBitClient
+from services.radarr import RadarrClient
+from services.sonarr import SonarrClient
+
+logger = logging.getLogger(__name__)
+
+ORIGINS = ("Radarr", "Sonarr")
+DELETE_TYPES = ("media", "torrent")
+
+
+def parse_hashes(value):
+    """Accepts a list of hashes or a comma-separated string."""
+    if isinstance(value, str):
+        value = value.split(",")
+    return [h.strip() for h in value or [] if h and h.strip()]
+
+
+def validate_item(item):
+    """Returns why `item` is not a valid deletion item (see DeletionService), or None."""
+    if not isinstance(item, dict):
+        return "Each item must be an object"
+    if item.get("origin") not in ORIGINS:
+        return f"Unknown origin {item.get('origin')!r}"
+    media_id = item.get("id")
+    if isinstance(media_id, str) and media_id.strip().isdigit():
+        media_id = int(media_id)
+    if not isinstance(media_id, int) or isinstance(media_id, bool):
+        return f"Invalid id {item.get('id')!r}"
+    if item.get("delete_type", "media") not in DELETE_TYPES:
+        return f"Unknown delete_type {item.get('delete_type')!r}"
+    hashes = item.get("torrent_hashes")
+    if hashes is not None and not (
+        isinstance(hashes, str)
+        or (isinstance(hashes, list) and all(isinstance(h, str) for h in hashes))
+    ):
+        return "torrent_hashes must be a string or a list of strings"
+    return None
+
+
+class DeletionService:
+    """
+    Deletes media items in bulk. All torrents go to qBittorrent in one request,
+    and Radarr/Sonarr items are removed through their editor endpoints, one
+    request per service.
+
+    Each item is a dict:
+    {
+        "origin": "Radarr" | "Sonarr",
+        "id": 123,
+        "torrent_hashes": ["abc...", ...] or "abc...,def...",
+        "delete_type": "media" | "torrent"   # "torrent" keeps the library entry
+    }
+    """
+
+    def __init__(self):
+        self.radarr = get_client(RadarrClient)
+        self.sonarr = get_client(SonarrClient)
+        self.qbit = get_client(QBitClient)
+
+    def delete_items(self, items):
+        """Returns one result per item, in the same order."""
+        results = []
+        item_hashes = []
+        all_hashes = []
+        media_ids = {"Radarr": [], "Sonarr": []}
+
+        for item in items:
+            origin = item.get("origin")
+            delete_type = item.get("delete_type", "media")
+            result = {
+                "origin": origin,
+                "id": item.get("id"),
+                "delete_type": delete_type,
+                "torrents": "skipped",
+                "media": "skipped",
+                "ok": False,
+                "error": None,
+            }
+            results.append(result)
+            hashes = parse_hashes(item.get("torrent_hashes"))
+            item_hashes.append(hashes)
+
+            if delete_type not in DELETE_TYPES:
+                result["error"] = f"Unknown delete_type '{delete_type}'"
+                continue
+
+            if delete_type == "media":
+                if origin not in media_ids:
+                    result["error"] = f"Unknown origin '{origin}'"
+                    continue
+                try:
+                    result["id"] = int(item.get("id"))
+                except (TypeError, ValueError):
+                    result["error"] = f"Invalid id '{item.get('id')}'"
+                    continue
+                media_ids[origin].append(result["id"])
+
+            all_hashes.extend(hashes)
+
+        # Delete Torrents
+        torrents_ok = (
+            self.qbit.delete_torrents(list(dict.fromkeys(all_hashes)))
+            if all_hashes
+            else True
+        )
+
+        # Delete Media from Radarr/Sonarr
+        media_ok = {
+            "Radarr": self.radarr.bulk_delete_movies(media_ids["Radarr"])
+            if media_ids["Radarr"]
+            else True,
+            "Sonarr": self.sonarr.bulk_delete_series(media_ids["Sonarr"])
+            if media_ids["Sonarr"]
+            else True,
+        }
+
+        for result, hashes in zip(results, item_hashes):
+            if result["error"]:
+                continue
+            if hashes:
+                result["torrents"] = "deleted" if torrents_ok else "failed"
+            if result["delete_type"] == "media":
+                result["media"] = "deleted" if media_ok[result["origin"]] else "failed"
+            result["ok"] = "failed" not in (result["torrents"], result["media"])
+            if not result["ok"]:
+                result["error"] = "Upstream delete request failed"
+
+        for result in results:
+            DELETED_ITEMS.inc(
+                origin=result["origin"], result="ok" if result["ok"] else "failed"
+            )
+        logger.info(
+            f"Bulk delete: {sum(r['ok'] for r in results)}/{len(results)} items succeeded."
+        )
+        return results
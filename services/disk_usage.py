@@ -0,0 +1,205 @@
+"""
+Disk usage of the volumes holding the Radarr and Sonarr root folders.
+
+Both services report their mounts (diskspace) and root folders. They are
+fetched together at most once per DISK_USAGE_TTL seconds, and merged into
+the disk usage dict served with scans:
+{
+    "path": "/media", "label": "media",    # fullest volume, shown on the dashboard
+    "free": "1.60 TB", "total": "16.00 TB", "percent": 90.0,
+    "volumes": [
+        {
+            "path": "/media", "label": "media",
+            "free": "1.60 TB", "total": "16.00 TB", "percent": 90.0,
+            "free_bytes": 1759218604441, "total_bytes": 17592186044416,
+            "root_folders": ["/media/movies", "/media/tv"]
+        }
+    ]
+}
+Media records are mapped to their volume with VolumeIndex, so the disk rule
+(services.rules) is checked against the volume an item actually lives on.
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from services.config_manager import ConfigManager
+from services.http import collect_outcomes
+from services.profiling import in_context, span
+
+logger = logging.getLogger(__name__)
+
+
+def format_bytes(size):
+    power = 1024
+    n = 0
+    power_labels = {0: "", 1: "K", 2: "M", 3: "G", 4: "T", 5: "P"}
+    while size > power:
+        size /= power
+        n += 1
+    return f"{size:.2f} {power_labels.get(n, '')}B"
+
+
+def _normalise(path):
+    return os.path.normpath(path) if path else None
+
+
+class VolumeIndex:
+    """
+    Longest-prefix lookup of the volume (mount path) holding a path.
+
+    Mounts are stored by normalised path; a lookup walks up the path's parent
+    directories until one of them is a mount, so only whole components match
+    ("/media" holds "/media/tv" but not "/mediax").
+    """
+
+    def __init__(self, paths):
+        self._mounts = {}
+        for path in paths:
+            if path:
+                self._mounts.setdefault(_normalise(path), path)
+
+    def __len__(self):
+        return len(self._mounts)
+
+    def lookup(self, path):
+        """The mount path holding `path` (as reported by the service), or None."""
+        if not path or not self._mounts:
+            return None
+        current = _normalise(path)
+        while True:
+            mount = self._mounts.get(current)
+            if mount is not None:
+                return mount
+            parent = os.path.dirname(current)
+            if parent == current:
+                return None
+            current = parent
+
+
+def volume_index(disk_usage):
+    """VolumeIndex over the volumes of a disk usage dict (see module docstring)."""
+    volumes = disk_usage.get("volumes", []) if disk_usage else []
+    return VolumeIndex(v["path"] for v in volumes)
+
+
+def _volume(disk):
+    free = disk.get("freeSpace", 0) or 0
+    total = disk.get("totalSpace", 0) or 0
+    percent = ((total - free) / total * 100) if total > 0 else 0
+    return {
+        "path": disk.get("path"),
+        "label": disk.get("label"),
+        "free": format_bytes(free),
+        "total": format_bytes(total),
+        "percent": round(percent, 2),
+        "free_bytes": free,
+        "total_bytes": total,
+        "root_folders": [],
+    }
+
+
+def summarise(disks, root_folders):
+    """
+    Builds the disk usage dict from diskspace entries and root folder paths.
+    Only volumes holding a root folder are kept, unless no root folder maps to
+    any (then every volume is). Returns None without disks.
+    """
+    volumes = {}
+    for disk in disks:
+        path = disk.get("path")
+        # Radarr and Sonarr usually see the same mounts, the first report wins
+        if path and path not in volumes:
+            volumes[path] = _volume(disk)
+    if not volumes:
+        return None
+
+    index = VolumeIndex(volumes)
+    for folder in root_folders:
+        mount = index.lookup(folder)
+        if mount is not None and folder not in volumes[mount]["root_folders"]:
+            volumes[mount]["root_folders"].append(folder)
+
+    used = [v for v in volumes.values() if v["root_folders"]]
+    if not used:
+        used = list(volumes.values())
+    fullest = max(used, key=lambda v: v["percent"])
+    return {
+        "path": fullest["path"],
+        "label": fullest["label"],
+        "free": fullest["free"],
+        "total": fullest["total"],
+        "percent": fullest["percent"],
+        "volumes": used,
+    }
+
+
+class DiskUsageService:
+    """
+    Process-wide, short-lived cache of the disk usage. Every scan reads it through
+    MatcherService.get_disk_usage(), so one TTL window costs one diskspace and one
+    rootfolder call per service. A fetch with any failed call is not cached (its
+    partial result would leave the other service's items on the wrong volume),
+    and new connection settings (other client host or API key) refetch.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(DiskUsageService, cls).__new__(cls)
+            cls._instance._lock = threading.Lock()
+            cls._instance._cached = None  # (settings key, fetched at, disk usage)
+        return cls._instance
+
+    def get(self, radarr, sonarr, force=False):
+        """Disk usage as seen by the given Radarr and Sonarr clients, or None."""
+        ttl = float(ConfigManager().get("DISK_USAGE_TTL", 60))
+        key = (radarr.host, radarr.api_key, sonarr.host, sonarr.api_key)
+        # Concurrent callers wait for the fetch in progress rather than repeating it
+        with self._lock:
+            cached = self._cached
+            if (
+                not force
+                and cached is not None
+                and cached[0] == key
+                and time.time() - cached[1] < ttl
+            ):
+                return cached[2]
+            disk_usage, complete = self._fetch(radarr, sonarr)
+            if disk_usage is not None and complete:
+                self._cached = (key, time.time(), disk_usage)
+            return disk_usage
+
+    def invalidate(self):
+        self._cached = None
+
+    def _fetch(self, radarr, sonarr):
+        """Returns (disk usage, whether every call succeeded)."""
+        calls = (
+            radarr.get_disk_space,
+            sonarr.get_disk_space,
+            radarr.get_root_folders,
+            sonarr.get_root_folders,
+        )
+        complete = True
+        with span("disk_usage"), collect_outcomes() as outcomes:
+            with ThreadPoolExecutor(max_workers=len(calls)) as executor:
+                futures = [executor.submit(in_context(call)) for call in calls]
+                results = []
+                for future in futures:
+                    try:
+                        results.append(future.result() or [])
+                    except Exception as e:
+                        logger.error(f"Error fetching disk usage: {e}")
+                        results.append([])
+                        complete = False
+        # The clients log failed calls and return an empty list
+        complete = complete and all(outcomes.values())
+
+        radarr_disks, sonarr_disks, radarr_folders, sonarr_folders = results
+        folders = [f.get("path") for f in radarr_folders + sonarr_folders if f.get("path")]
+        return summarise(radarr_disks + sonarr_disks, folders), complete
@@ -0,0 +1,185 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from services.breaker import get_breaker
+from services.config_manager import ConfigManager
+from services.http import get_client
+from services.jellyfin import JellyfinClient
+from services.metrics import SERVICE_UP
+from services.profiling import in_context, span
+from services.qbittorrent import QBitClient
+from services.radarr import RadarrClient
+from services.shared_store import get_store
+from services.sonarr import SonarrClient
+
+logger = logging.getLogger(__name__)
+
+# Display name -> (client class, session / circuit breaker name)
+SERVICES = {
+    "Radarr": (RadarrClient, "radarr"),
+    "Sonarr": (SonarrClient, "sonarr"),
+    "qBittorrent": (QBitClient, "qbittorrent"),
+    "Jellyfin": (JellyfinClient, "jellyfin"),
+}
+# check_connection times out after 5s, so the first round ends well within this
+FIRST_PROBE_TIMEOUT = 10
+UNKNOWN = {"online": False, "checked_at": None, "changed_at": None, "latency_ms": None}
+# Shared store lock and state names (multi-worker serving)
+PROBER_LOCK = "health_prober"
+HEALTH_STATE = "health"
+
+
+class HealthMonitor:
+    """
+    Background prober of the upstream services.
+
+    A daemon thread checks every service concurrently each HEALTH_INTERVAL
+    seconds and keeps the results, so status reads never wait on a slow or
+    unreachable service. Probes go through the clients' sessions, hence through
+    the circuit breakers (services.breaker): they feed the failure counts, fail
+    fast while a circuit is open, and act as the half-open trial once its
+    backoff expires.
+
+    With a shared store (SNAPSHOT_STORE), a single worker process probes: the
+    one holding the prober lock, renewed every round. It stores the results,
+    which every worker then serves.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(HealthMonitor, cls).__new__(cls)
+            cls._instance._statuses = {}
+            cls._instance._lock = threading.Lock()
+            cls._instance._wake = threading.Event()
+            cls._instance._probed = threading.Event()
+            cls._instance._thread = None
+            cls._instance._pid = None
+        return cls._instance
+
+    def start(self):
+        """Starts the prober thread, again in a forked worker process."""
+        with self._lock:
+            if (
+                self._thread is not None
+                and self._thread.is_alive()
+                and self._pid == os.getpid()
+            ):
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name="health-prober", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        forced = False
+        while True:
+            interval = float(ConfigManager().get("HEALTH_INTERVAL", 30))
+            try:
+                # A refresh() probes in any worker
+                if forced or self._is_prober(interval):
+                    self.probe()
+            except Exception as e:
+                logger.error(f"Health probe failed: {e}")
+            forced = self._wake.wait(interval)
+            self._wake.clear()
+
+    def _is_prober(self, interval):
+        store = get_store()
+        if store is None:
+            return True
+        # Outlives a missed round, so another worker takes over only if this one stops
+        return store.acquire_lock(PROBER_LOCK, 2 * interval + FIRST_PROBE_TIMEOUT)
+
+    def refresh(self):
+        """Wakes the prober for an immediate round, e.g. after settings changed."""
+        self.start()
+        self._wake.set()
+
+    def _check(self, name):
+        client_cls, _ = SERVICES[name]
+        started = time.perf_counter()
+        with span(f"health:{name}"):
+            try:
+                online = bool(get_client(client_cls).check_connection())
+            except Exception as e:
+                logger.error(f"Error checking {name}: {e}")
+                online = False
+        return online, time.perf_counter() - started
+
+    def probe(self):
+        """Checks every service now and stores the results."""
+        with ThreadPoolExecutor(max_workers=len(SERVICES)) as executor:
+            check = in_context(self._check)
+            results = dict(zip(SERVICES, executor.map(check, SERVICES)))
+
+        now = time.time()
+        with self._lock:
+            for name, (online, seconds) in results.items():
+                previous = self._statuses.get(name)
+                changed_at = now
+                if previous is not None and previous["online"] == online:
+                    changed_at = previous["changed_at"]
+                elif previous is not None:
+                    logger.info(f"{name} is now {'online' if online else 'offline'}.")
+                self._statuses[name] = {
+                    "online": online,
+                    "checked_at": now,
+                    "changed_at": changed_at,
+                    "latency_ms": round(seconds * 1000, 1),
+                }
+                SERVICE_UP.set(1 if online else 0, service=name)
+            statuses = dict(self._statuses)
+        self._probed.set()
+
+        store = get_store()
+        if store is not None:
+            try:
+                store.save_state(HEALTH_STATE, statuses)
+            except Exception as e:
+                logger.error(f"Failed to share the health probe results: {e}")
+
+    def _snapshot(self):
+        self.start()
+        store = get_store()
+        if store is not None:
+            statuses = self._shared_statuses(store)
+            if statuses is not None:
+                return {name: dict(statuses.get(name, UNKNOWN)) for name in SERVICES}
+        else:
+            # The first reads wait for the first round rather than report every
+            # service offline (_shared_statuses() already waited for it)
+            self._probed.wait(FIRST_PROBE_TIMEOUT)
+        with self._lock:
+            return {name: dict(self._statuses.get(name, UNKNOWN)) for name in SERVICES}
+
+    def _shared_statuses(self, store):
+        """The prober worker's last results, waiting for its first round if needed."""
+        deadline = time.monotonic() + FIRST_PROBE_TIMEOUT
+        while True:
+            try:
+                statuses = store.load_state(HEALTH_STATE)
+            except Exception as e:
+                logger.error(f"Failed to load the shared health probe results: {e}")
+                return None
+            if statuses is not None or self._probed.is_set():
+                return statuses
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(0.25)
+
+    def statuses(self):
+        """{service: online} from the last probe."""
+        return {name: status["online"] for name, status in self._snapshot().items()}
+
+    def details(self):
+        """Last probe results per service, with the circuit breaker state."""
+        statuses = self._snapshot()
+        for name, status in statuses.items():
+            status["circuit"] = get_breaker(SERVICES[name][1]).to_dict()
+        return statuses
@@ -0,0 +1,157 @@
+import json
+import logging
+import os
+import threading
+
+from services.config_manager import ConfigManager
+from services.metrics import HISTORY_RECORDS
+
+logger = logging.getLogger(__name__)
+
+HISTORY_FILE = "config/history_{name}.json"
+# Size of the first history page of a sync; later pages double up to HISTORY_PAGE_SIZE
+FIRST_PAGE_SIZE = 20
+
+
+class HistorySync:
+    """
+    Maintains a persisted media id -> download id index from Radarr/Sonarr history.
+
+    The first sync pages through the whole history. Later syncs fetch pages by
+    descending record id and stop at the stored high-water mark (the highest
+    history record id seen). Pages start at FIRST_PAGE_SIZE records and double
+    while none reaches the mark, so a steady-state scan transfers one small page.
+
+    Index structure:
+    {
+        <movieId|seriesId>: {
+            "<downloadId lower-cased>": [{"seasonNumber": 1, "episodeNumber": 2}, ...]
+        }
+    }
+    The episode list is only filled for Sonarr.
+    """
+
+    # Shared across instances so concurrent scans reuse one in-memory index per source
+    _states = {}
+    _locks = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, name, client, media_key):
+        self.name = name
+        self.client = client
+        self.media_key = media_key
+        self.path = HISTORY_FILE.format(name=name)
+        with self._registry_lock:
+            self._lock = self._locks.setdefault(name, threading.Lock())
+
+    def _empty_state(self):
+        return {"host": self.client.host, "high_water_id": 0, "index": {}}
+
+    def _load(self):
+        state = self._states.get(self.name)
+        if state is None and os.path.exists(self.path):
+            try:
+                with open(self.path, "r") as f:
+                    raw = json.load(f)
+                raw["index"] = {int(k): v for k, v in raw.get("index", {}).items()}
+                state = raw
+            except Exception as e:
+                logger.error(f"Failed to load {self.name} history index: {e}")
+
+        # A different host means a different history; start over
+        if state is None or state.get("host") != self.client.host:
+            state = self._empty_state()
+        self._states[self.name] = state
+        return state
+
+    def _save(self, state):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"Failed to save {self.name} history index: {e}")
+
+    def _fetch_new_records(self, high_water_id, page_size):
+        """
+        Returns history records newer than high_water_id, or None if a page failed.
+        """
+        records = []
+        size = min(FIRST_PAGE_SIZE, page_size)
+        # Records fetched so far; always a multiple of the page size
+        offset = 0
+        while True:
+            data = self.client.get_history_page(page=offset // size + 1, page_size=size)
+            if data is None:
+                return None
+
+            page_records = data.get("records", [])
+            for record in page_records:
+                if record.get("id", 0) <= high_water_id:
+                    return records
+                records.append(record)
+
+            offset += size
+            total = data.get("totalRecords", 0)
+            if not page_records or offset >= total:
+                return records
+            if offset < page_size:
+                # Next page covers as many records as all previous ones
+                size = offset
+
+    def sync(self):
+        """Brings the index up to date and returns it."""
+        if not self.client.host:
+            return {}
+
+        page_size = int(ConfigManager().get("HISTORY_PAGE_SIZE", 1000))
+
+        with self._lock:
+            state = self._load()
+            records = self._fetch_new_records(state["high_water_id"], page_size)
+            if records is None:
+                logger.warning(
+                    f"{self.name} history sync failed, using the last known index."
+                )
+                return state["index"]
+
+            # Copy-on-write: indexes handed out by earlier syncs stay untouched
+            index = dict(state["index"])
+            copied = set()
+            # Oldest first so episode lists keep history order
+            for record in reversed(records):
+                media_id = record.get(self.media_key)
+                d_id = record.get("downloadId")
+                if not media_id or not d_id:
+                    continue
+                if media_id not in copied:
+                    index[media_id] = {
+                        h: list(eps) for h, eps in index.get(media_id, {}).items()
+                    }
+                    copied.add(media_id)
+                episodes = index[media_id].setdefault(str(d_id).lower(), [])
+                ep = record.get("episode")
+                if ep:
+                    episodes.append(
+                        {
+                            k: ep[k]
+                            for k in ("seasonNumber", "episodeNumber")
+                            if k in ep
+                        }
+                    )
+
+            if records:
+                HISTORY_RECORDS.inc(len(records), source=self.name)
+                state["index"] = index
+                state["high_water_id"] = max(
+                    state["high_water_id"], max(r.get("id", 0) for r in records)
+                )
+                self._save(state)
+
+            logger.info(
+                f"Synced {len(records)} new {self.name} history records "
+                f"({len(index)} indexed, high-water id {state['high_water_id']})."
+            )
+            return index
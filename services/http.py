@@ -0,0 +1,159 @@
+import contextvars
+import re
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from services.breaker import CircuitOpenError, get_breaker
+from services.config_manager import ConfigManager
+from services.metrics import UPSTREAM_LATENCY, UPSTREAM_REQUESTS, UPSTREAM_RESPONSE_SIZE
+from services.profiling import span
+
+_sessions = {}
+_clients = {}
+_sessions_lock = threading.Lock()
+_clients_lock = threading.Lock()
+
+
+# URL -> whether its last attempt succeeded, see collect_outcomes()
+_outcomes = contextvars.ContextVar("upstream_outcomes", default=None)
+
+# Numeric ids and Jellyfin/qBittorrent style hex ids
+_ID_SEGMENT = re.compile(r"^(\d+|[0-9a-fA-F]{32}|[0-9a-fA-F]{40})$")
+
+
+def endpoint_label(url):
+    """URL path with ids replaced, e.g. /api/v3/movie/:id, to keep label values bounded."""
+    segments = urlsplit(url).path.split("/")
+    return "/".join(":id" if _ID_SEGMENT.match(s) else s for s in segments) or "/"
+
+
+@contextmanager
+def collect_outcomes():
+    """
+    Collects {url: succeeded} for the requests sent by the enclosed code (and by
+    work it hands to services.profiling.in_context). A URL requested again, e.g.
+    after a qBittorrent re-login, keeps its last outcome. Requests fail when
+    they raise, are refused by the circuit breaker or get a 4xx/5xx status.
+    Outcomes also reach the enclosing collector, if any.
+    """
+    outcomes = {}
+    token = _outcomes.set(outcomes)
+    try:
+        yield outcomes
+    finally:
+        _outcomes.reset(token)
+        parent = _outcomes.get()
+        if parent is not None:
+            parent.update(outcomes)
+
+
+def _record_outcome(url, succeeded):
+    outcomes = _outcomes.get()
+    if outcomes is not None:
+        outcomes[url] = succeeded
+
+
+class InstrumentedAdapter(HTTPAdapter):
+    """
+    Pooled adapter recording latency, status and response size of every request,
+    and enforcing the service's circuit breaker (services.breaker): requests to a
+    service known to be down raise CircuitOpenError without being sent.
+    """
+
+    def __init__(self, service, **kwargs):
+        self.service = service
+        self.breaker = get_breaker(service)
+        super().__init__(**kwargs)
+
+    def send(self, request, stream=False, **kwargs):
+        endpoint = endpoint_label(request.url)
+        if not self.breaker.allow():
+            _record_outcome(request.url, False)
+            UPSTREAM_REQUESTS.inc(
+                service=self.service,
+                method=request.method,
+                endpoint=endpoint,
+                status="circuit_open",
+            )
+            raise CircuitOpenError(
+                f"{self.service} is unavailable, not retrying before the circuit half-opens",
+                request=request,
+            )
+
+        started = time.perf_counter()
+        try:
+            with span(f"{self.service} {request.method} {endpoint}"):
+                response = super().send(request, stream=stream, **kwargs)
+                if not stream:
+                    # Read the body now so its transfer counts in the duration
+                    size = len(response.content)
+                    UPSTREAM_RESPONSE_SIZE.observe(
+                        size, service=self.service, endpoint=endpoint
+                    )
+        except Exception:
+            _record_outcome(request.url, False)
+            self.breaker.record_failure()
+            UPSTREAM_REQUESTS.inc(
+                service=self.service, method=request.method, endpoint=endpoint, status="error"
+            )
+            raise
+        finally:
+            UPSTREAM_LATENCY.observe(
+                time.perf_counter() - started,
+                service=self.service,
+                method=request.method,
+                endpoint=endpoint,
+            )
+        _record_outcome(request.url, response.status_code < 400)
+        # Client errors (auth, not found) come from a working service
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        UPSTREAM_REQUESTS.inc(
+            service=self.service,
+            method=request.method,
+            endpoint=endpoint,
+            status=response.status_code,
+        )
+        return response
+
+
+def get_session(service):
+    """
+    Returns the long-lived session for an upstream service. Connections are pooled
+    and kept alive across requests; the pool size is read from HTTP_POOL_SIZE when
+    the session is first created.
+    """
+    with _sessions_lock:
+        session = _sessions.get(service)
+        if session is None:
+            pool_size = int(ConfigManager().get("HTTP_POOL_SIZE", 10))
+            adapter = InstrumentedAdapter(
+                service, pool_connections=1, pool_maxsize=pool_size
+            )
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _sessions[service] = session
+        return session
+
+
+def get_client(client_cls):
+    """
+    Returns a shared instance of a service client. The instance is rebuilt only
+    when one of the settings listed in its CONFIG_KEYS changes.
+    """
+    config = ConfigManager()
+    key = tuple(config.get(k) for k in client_cls.CONFIG_KEYS)
+    with _clients_lock:
+        cached = _clients.get(client_cls)
+        if cached is None or cached[0] != key:
+            cached = (key, client_cls())
+            _clients[client_cls] = cached
+        return cached[1]
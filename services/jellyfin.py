@@ -1,18 +1,25 @@
 import logging
-
-import requests
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 from services.config_manager import ConfigManager
+from services.http import get_session
+from services.profiling import in_context, span
 
 logger = logging.getLogger(__name__)
 
 
 class JellyfinClient:
+    CONFIG_KEYS = ("JELLYFIN_HOST", "JELLYFIN_API_KEY")
+
     def __init__(self):
         config = ConfigManager()
         self.host = config.get("JELLYFIN_HOST")
         self.api_key = config.get("JELLYFIN_API_KEY")
+        self.session = get_session("jellyfin")
         self.users = []
+        self.provider_index = {}
+        self.provider_collisions = {}
 
     def _get_headers(self):
         return {
@@ -30,7 +37,7 @@ class JellyfinClient:
             url = f"{base_url}/Users"
             headers = self._get_headers()
 
-            response = requests.get(url, headers=headers, timeout=(5, 60))
+            response = self.session.get(url, headers=headers, timeout=(5, 60))
             response.raise_for_status()
             self.users = response.json()
             return self.users
@@ -38,86 +45,155 @@ class JellyfinClient:
             logger.error(f"Error fetching users from Jellyfin: {e}")
             return []
 
-    def get_user_items(self, user_id):
-        """Fetch all items for a specific user to check play state."""
+    def iter_user_item_pages(self, user_id, page_size=1000):
+        """Fetch a user's items page by page (StartIndex/Limit), yielding each page."""
         if not self.host or not self.api_key:
-            return []
+            return
 
-        try:
-            base_url = self.host.rstrip("/")
-            # IncludeItemTypes: Movie,Episode
-            # Recursive: true to get all nested items
-            # Fields: Path,ProviderIds so we can match
-            url = f"{base_url}/Users/{user_id}/Items"
+        base_url = self.host.rstrip("/")
+        # IncludeItemTypes: Movie,Episode
+        # Recursive: true to get all nested items
+        # Fields: Path,ProviderIds so we can match
+        url = f"{base_url}/Users/{user_id}/Items"
+        headers = self._get_headers()
+        start_index = 0
+
+        while True:
             params = {
                 "Recursive": "true",
                 "IncludeItemTypes": "Movie,Episode,Series",
                 "Fields": "Path,ProviderIds,UserData",
+                "EnableImages": "false",
+                "StartIndex": start_index,
+                "Limit": page_size,
             }
-            headers = self._get_headers()
+            try:
+                response = self.session.get(
+                    url, headers=headers, params=params, timeout=(5, 60)
+                )
+                response.raise_for_status()
+                data = response.json()
+            except Exception as e:
+                logger.error(
+                    f"Error fetching items for user {user_id} from Jellyfin: {e}"
+                )
+                return
+
+            items = data.get("Items", [])
+            if items:
+                yield items
+
+            start_index += len(items)
+            total = data.get("TotalRecordCount", 0)
+            if len(items) < page_size or start_index >= total:
+                return
 
-            response = requests.get(
-                url, headers=headers, params=params, timeout=(5, 60)
-            )
-            response.raise_for_status()
-            return response.json().get("Items", [])
-        except Exception as e:
-            logger.error(f"Error fetching items for user {user_id} from Jellyfin: {e}")
-            return []
+    def get_user_items(self, user_id):
+        """Fetch all items for a specific user to check play state."""
+        items = []
+        for page in self.iter_user_item_pages(user_id):
+            items.extend(page)
+        return items
+
+    def _fold_items(self, aggregated_data, items):
+        for item in items:
+            # Identification logic
+            # Movies usually have tmdb/imdb. Episodes have tvdb usually.
+            # We need a robust key. Let's try to use ProviderIds.
+            provider_ids = item.get("ProviderIds", {})
+
+            # Check watched status
+            user_data = item.get("UserData", {})
+            is_played = user_data.get("Played", False)
+
+            item_id = item["Id"]
+
+            if item_id not in aggregated_data:
+                aggregated_data[item_id] = {
+                    "Name": item.get("Name"),
+                    "Path": item.get("Path"),
+                    "ProviderIds": provider_ids,
+                    "Type": item.get("Type"),
+                    "Watched": is_played,
+                }
+            else:
+                # If already exists, just OR the watched status (if watched by *at least one* user)
+                if is_played:
+                    aggregated_data[item_id]["Watched"] = True
 
     def get_all_items_with_play_status(self):
         """
         Aggregates items from all users and determines if they have been watched by at least one user.
-        Returns a dictionary keyed by provider ID (e.g., imdb, tmdb, tvdb) or path?
-        Provider IDs are safer for matching.
+        Users are crawled in parallel (JELLYFIN_WORKERS) and each page is folded into the
+        aggregate as it arrives, so memory does not grow with users x items.
         Structure:
         {
-            "tmdb_12345": {
-                "watched": True,
-                "title": "Movie Title"
+            "<Jellyfin item id>": {
+                "Name": "Movie Title",
+                "Path": "/media/movies/...",
+                "ProviderIds": {"Tmdb": "603", ...},
+                "Type": "Movie",
+                "Watched": True
             }
         }
         """
-        if not self.users:
-            self.get_users()
+        # Refreshed on every crawl since clients are long-lived
+        users = self.get_users()
+
+        cm = ConfigManager()
+        workers = int(cm.get("JELLYFIN_WORKERS", 4))
+        page_size = int(cm.get("JELLYFIN_PAGE_SIZE", 1000))
 
         aggregated_data = {}
+        lock = threading.Lock()
 
-        for user in self.users:
-            user_id = user["Id"]
-            items = self.get_user_items(user_id)
-
-            for item in items:
-                # Identification logic
-                # Movies usually have tmdb/imdb. Episodes have tvdb usually.
-                # We need a robust key. Let's try to use ProviderIds.
-                provider_ids = item.get("ProviderIds", {})
-
-                # Construct a composite key if possible, or list of keys
-                # For simplicity, we might iterate and check matches later.
-                # Let's just store by internal Jellyfin ID first, but also map provider IDs.
-
-                # Check watched status
-                user_data = item.get("UserData", {})
-                is_played = user_data.get("Played", False)
-
-                item_id = item["Id"]
-
-                if item_id not in aggregated_data:
-                    aggregated_data[item_id] = {
-                        "Name": item.get("Name"),
-                        "Path": item.get("Path"),
-                        "ProviderIds": provider_ids,
-                        "Type": item.get("Type"),
-                        "Watched": is_played,
-                    }
-                else:
-                    # If already exists, just OR the watched status (if watched by *at least one* user)
-                    if is_played:
-                        aggregated_data[item_id]["Watched"] = True
+        def crawl(user_id):
+            with span("jellyfin_user", user=user_id):
+                for page in self.iter_user_item_pages(user_id, page_size=page_size):
+                    with lock:
+                        self._fold_items(aggregated_data, page)
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            list(executor.map(in_context(crawl), [user["Id"] for user in users]))
 
         return aggregated_data
 
+    def build_provider_index(self, aggregated_data):
+        """
+        Indexes aggregated items by (Type, provider, id), e.g. ("Movie", "Tmdb", "603").
+        Several Jellyfin items can share a provider ID (multiple versions, libraries);
+        they are merged into one entry that counts as watched if any of them is watched.
+        Returns the index and the subset of keys that had collisions.
+        """
+        index = {}
+        for item_id, item in aggregated_data.items():
+            item_type = item.get("Type")
+            for provider, value in (item.get("ProviderIds") or {}).items():
+                if not value:
+                    continue
+                key = (item_type, provider, str(value))
+                entry = index.get(key)
+                if entry is None:
+                    index[key] = {"Watched": item["Watched"], "ItemIds": [item_id]}
+                else:
+                    entry["Watched"] = entry["Watched"] or item["Watched"]
+                    entry["ItemIds"].append(item_id)
+
+        collisions = {k: v for k, v in index.items() if len(v["ItemIds"]) > 1}
+        if collisions:
+            logger.info(
+                f"{len(collisions)} provider IDs map to several Jellyfin items, merged by watched state."
+            )
+        return index, collisions
+
+    def get_provider_index(self):
+        """Fetches play status for all users and returns the provider index."""
+        index, collisions = self.build_provider_index(
+            self.get_all_items_with_play_status()
+        )
+        self.provider_index, self.provider_collisions = index, collisions
+        return index
+
     def check_connection(self):
         if not self.host or not self.api_key:
             return False
@@ -125,7 +201,7 @@ class JellyfinClient:
             base_url = self.host.rstrip("/")
             url = f"{base_url}/System/Info"
             headers = self._get_headers()
-            requests.get(url, headers=headers, timeout=5).raise_for_status()
+            self.session.get(url, headers=headers, timeout=5).raise_for_status()
             return True
         except Exception:
             return False
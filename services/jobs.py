@@ -0,0 +1,176 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from services.config_manager import ConfigManager
+from services.deletion import DeletionService
+from services.disk_usage import DiskUsageService
+from services.metrics import DELETION_BATCH_DURATION, DELETION_JOBS
+from services.shared_store import get_store
+from services.snapshot import SnapshotCache
+
+logger = logging.getLogger(__name__)
+
+JOBS_FILE = "config/jobs.json"
+MAX_KEPT_JOBS = 100
+
+
+class DeletionJobQueue:
+    """
+    Runs deletions in the background on a bounded worker pool (DELETE_WORKERS).
+
+    Items of a job are deleted in batches of DELETE_BATCH_SIZE, and progress is
+    updated after each batch. Job state is persisted to JOBS_FILE so it survives a
+    restart; jobs that were still queued or running are then marked interrupted.
+    With a shared store (SNAPSHOT_STORE), jobs are persisted there instead, so any
+    worker process can report a job run by another; gunicorn.conf.py marks them
+    interrupted when the server starts.
+
+    Job structure:
+    {
+        "id": "...",
+        "status": "queued" | "running" | "done" | "failed" | "interrupted",
+        "created_at": 1700000000.0,
+        "started_at": None,
+        "finished_at": None,
+        "total": 200,
+        "processed": 50,
+        "deleted": 48,
+        "failed": 2,
+        "results": [...]   # per-item report, see DeletionService
+    }
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(DeletionJobQueue, cls).__new__(cls)
+            cls._instance._init()
+        return cls._instance
+
+    def _init(self):
+        workers = int(ConfigManager().get("DELETE_WORKERS", 2))
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers))
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._store = get_store()
+        if self._store is None:
+            self._load()
+
+    def _load(self):
+        if not os.path.exists(JOBS_FILE):
+            return
+        try:
+            with open(JOBS_FILE, "r") as f:
+                self._jobs = json.load(f)
+        except Exception as e:
+            logger.error(f"Failed to load jobs file: {e}")
+            return
+
+        for job in self._jobs.values():
+            if job["status"] in ("queued", "running"):
+                job["status"] = "interrupted"
+                job["finished_at"] = time.time()
+
+    def _save(self, job_id):
+        # Called with self._lock held
+        if self._store is not None:
+            try:
+                self._store.save_job(self._jobs[job_id])
+            except Exception as e:
+                logger.error(f"Failed to save job {job_id}: {e}")
+            return
+        try:
+            os.makedirs(os.path.dirname(JOBS_FILE), exist_ok=True)
+            tmp_path = f"{JOBS_FILE}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._jobs, f)
+            os.replace(tmp_path, JOBS_FILE)
+        except Exception as e:
+            logger.error(f"Failed to save jobs file: {e}")
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            self._jobs[job_id].update(fields)
+            self._save(job_id)
+
+    def submit(self, items):
+        """Queues a deletion of `items` and returns the job id right away."""
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._jobs[job_id] = {
+                "id": job_id,
+                "status": "queued",
+                "created_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "total": len(items),
+                "processed": 0,
+                "deleted": 0,
+                "failed": 0,
+                "results": [],
+            }
+            # Keep the most recent jobs only
+            for old_id in list(self._jobs)[:-MAX_KEPT_JOBS]:
+                if self._jobs[old_id]["status"] not in ("queued", "running"):
+                    del self._jobs[old_id]
+            self._save(job_id)
+            if self._store is not None:
+                try:
+                    self._store.prune_jobs(MAX_KEPT_JOBS)
+                except Exception as e:
+                    logger.error(f"Failed to prune jobs: {e}")
+
+        self._executor.submit(self._run, job_id, list(items))
+        logger.info(f"Queued deletion job {job_id} for {len(items)} items")
+        return job_id
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job:
+                return json.loads(json.dumps(job))
+        if self._store is None:
+            return None
+        # Run by another worker process
+        try:
+            return self._store.load_job(job_id)
+        except Exception as e:
+            logger.error(f"Failed to load job {job_id}: {e}")
+            return None
+
+    def _run(self, job_id, items):
+        batch_size = max(1, int(ConfigManager().get("DELETE_BATCH_SIZE", 25)))
+        self._update(job_id, status="running", started_at=time.time())
+
+        results = []
+        try:
+            service = DeletionService()
+            for start in range(0, len(items), batch_size):
+                with DELETION_BATCH_DURATION.time():
+                    results.extend(
+                        service.delete_items(items[start : start + batch_size])
+                    )
+                deleted = sum(1 for r in results if r["ok"])
+                self._update(
+                    job_id,
+                    processed=len(results),
+                    deleted=deleted,
+                    failed=len(results) - deleted,
+                    results=list(results),
+                )
+            self._update(job_id, status="done", finished_at=time.time())
+            DELETION_JOBS.inc(status="done")
+        except Exception as e:
+            logger.error(f"Deletion job {job_id} failed: {e}")
+            self._update(job_id, status="failed", finished_at=time.time())
+            DELETION_JOBS.inc(status="failed")
+        finally:
+            # Deleted files free space, so disk usage is refetched with the matches
+            DiskUsageService().invalidate()
+            SnapshotCache().invalidate()
@@ -1,118 +1,293 @@
 import logging
-import os
 import re
+import threading
+import time
 from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
+from services.config_manager import ConfigManager
+from services.disk_usage import DiskUsageService, volume_index
+from services.health import HealthMonitor
+from services.history import HistorySync
+from services.http import collect_outcomes, get_client
 from services.jellyfin import JellyfinClient
+from services.metrics import (
+    MEDIA_MATCHES,
+    SCAN_DURATION,
+    SCAN_PHASE_DURATION,
+    SCANNED_ITEMS,
+    STALE_SOURCES,
+)
+from services.path_index import TorrentPathIndex
+from services.profiling import current_trace, in_context, record_span, span
 from services.qbittorrent import QBitClient
 from services.radarr import RadarrClient
+from services.records import MediaRecord, TorrentRecord
+from services.rules import DEFAULT_RULES, evaluate_record, full_volumes
 from services.sonarr import SonarrClient
 
 logger = logging.getLogger(__name__)
 
+# Source name -> services it is fetched from (the first one is reported)
+SOURCE_SERVICES = {
+    "radarr_movies": ("radarr",),
+    "radarr_history": ("radarr",),
+    "sonarr_series": ("sonarr",),
+    "sonarr_history": ("sonarr",),
+    "qbit_torrents": ("qbittorrent",),
+    "disk_usage": ("radarr", "sonarr"),
+    "jellyfin": ("jellyfin",),
+}
+BUDGET_KEYS = {
+    "radarr": "RADARR_FETCH_BUDGET",
+    "sonarr": "SONARR_FETCH_BUDGET",
+    "qbittorrent": "QBIT_FETCH_BUDGET",
+    "jellyfin": "JELLYFIN_FETCH_BUDGET",
+}
+
 
 class MatcherService:
+    # (source name, upstream hosts) -> (value, fetched at), see _fetch_source
+    _last_known_sources = {}
+    _last_known_lock = threading.Lock()
+
     def __init__(self):
-        self.radarr = RadarrClient()
-        self.sonarr = SonarrClient()
-        self.qbit = QBitClient()
-        self.jellyfin = JellyfinClient()
-
-    def _format_bytes(self, size):
-        power = 1024
-        n = 0
-        power_labels = {0: "", 1: "K", 2: "M", 3: "G", 4: "T", 5: "P"}
-        while size > power:
-            size /= power
-            n += 1
-        return f"{size:.2f} {power_labels.get(n, '')}B"
-
-    def _format_seed_time(self, seconds):
-        if not seconds:
-            return "0s"
-        days = seconds // 86400
-        hours = (seconds % 86400) // 3600
-        if days > 0:
-            return f"{days}d {hours}h"
-        elif hours > 0:
-            minutes = (seconds % 3600) // 60
-            return f"{hours}h {minutes}m"
-        else:
-            minutes = (seconds % 3600) // 60
-            return f"{minutes}m"
+        self.radarr = get_client(RadarrClient)
+        self.sonarr = get_client(SonarrClient)
+        self.qbit = get_client(QBitClient)
+        self.jellyfin = get_client(JellyfinClient)
+        self.radarr_history = HistorySync("radarr", self.radarr, "movieId")
+        self.sonarr_history = HistorySync("sonarr", self.sonarr, "seriesId")
+        self.disk_usage = None
+        self.stale_sources = {}
+
+    def _source_key(self, name):
+        """Last-known datasets are only reused for the same upstream hosts."""
+        clients = {
+            "radarr": self.radarr,
+            "sonarr": self.sonarr,
+            "qbittorrent": self.qbit,
+            "jellyfin": self.jellyfin,
+        }
+        return name, tuple(clients[s].host for s in SOURCE_SERVICES[name])
+
+    def _last_known(self, name):
+        with MatcherService._last_known_lock:
+            return MatcherService._last_known_sources.get(self._source_key(name))
+
+    def _fetch_source(self, name, fn):
+        """
+        Runs one source fetch and returns (value, failed URLs). Successful results
+        become the source's last-known dataset, also when the scan stopped waiting.
+        """
+        with span(f"fetch:{name}"), collect_outcomes() as outcomes:
+            value = fn()
+        failed = sorted(url for url, succeeded in outcomes.items() if not succeeded)
+        if not failed:
+            with MatcherService._last_known_lock:
+                MatcherService._last_known_sources[self._source_key(name)] = (
+                    value,
+                    time.time(),
+                )
+        return value, failed
+
+    def _budget(self, name):
+        cm = ConfigManager()
+        return min(
+            float(cm.get(BUDGET_KEYS[service], 60)) for service in SOURCE_SERVICES[name]
+        )
+
+    def _fetch_sources(self):
+        """
+        Runs every upstream call concurrently and returns their results keyed by
+        source name.
+
+        Each source gets the time budget of its service (RADARR_FETCH_BUDGET, ...)
+        and the whole fetch FETCH_DEADLINE. A source that fails (see
+        services.http.collect_outcomes) or misses its budget is replaced by its
+        last-known dataset and listed in self.stale_sources. Without a last-known
+        dataset the scan waits for it up to the deadline, and a failed source
+        keeps whatever its client returned (an empty value, or the client's own
+        last-known state for the history and torrent syncs).
+        """
+        cm = ConfigManager()
+        workers = int(cm.get("FETCH_WORKERS", 7))
+        deadline = float(cm.get("FETCH_DEADLINE", 90))
+        sync_torrents = bool(cm.get("QBIT_SYNC", True))
+
+        # name -> (callable, value used if the call fails or times out)
+        tasks = {
+            "radarr_movies": (self.radarr.get_movies, []),
+            "radarr_history": (self.radarr_history.sync, {}),
+            "sonarr_series": (self.sonarr.get_series, []),
+            "sonarr_history": (self.sonarr_history.sync, {}),
+            "qbit_torrents": (
+                self.qbit.sync_torrents if sync_torrents else self.qbit.get_torrents,
+                [],
+            ),
+            "disk_usage": (self.get_disk_usage, None),
+            "jellyfin": (self.jellyfin.get_provider_index, {}),
+        }
+        results = {name: default for name, (_, default) in tasks.items()}
+        # name -> "timeout" or "error"
+        missed = {}
+
+        started = time.perf_counter()
+        executor = ThreadPoolExecutor(max_workers=max(1, workers))
+        fetch = in_context(self._fetch_source)
+        pending = {
+            executor.submit(fetch, name, fn): name for name, (fn, _) in tasks.items()
+        }
+        # Budgets only cut off sources that have something to fall back on
+        cutoffs = {
+            name: min(self._budget(name), deadline)
+            if self._last_known(name) is not None
+            else deadline
+            for name in tasks
+        }
+        try:
+            while pending:
+                elapsed = time.perf_counter() - started
+                for future, name in list(pending.items()):
+                    if elapsed >= cutoffs[name]:
+                        del pending[future]
+                        missed[name] = "timeout"
+                if not pending:
+                    break
+                timeout = min(cutoffs[name] for name in pending.values()) - elapsed
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = pending.pop(future)
+                    try:
+                        value, failed = future.result()
+                    except Exception as e:
+                        logger.error(f"Error fetching {name}: {e}")
+                        missed[name] = "error"
+                        continue
+                    results[name] = value
+                    if failed:
+                        logger.warning(
+                            f"Fetching {name} failed for {len(failed)} request(s), e.g. {failed[0]}"
+                        )
+                        missed[name] = "error"
+        finally:
+            # Do not wait on stragglers; they still update the last-known datasets
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        self.stale_sources = {}
+        for name, reason in sorted(missed.items()):
+            last_known = self._last_known(name)
+            if last_known is not None:
+                results[name] = last_known[0]
+            fetched_at = last_known[1] if last_known is not None else None
+            self.stale_sources[name] = {
+                "service": SOURCE_SERVICES[name][0],
+                "reason": reason,
+                "fetched_at": fetched_at,
+            }
+            STALE_SOURCES.inc(source=name, reason=reason)
+            logger.warning(
+                f"Using the last-known {name} ({reason}, fetched at {fetched_at})."
+                if fetched_at is not None
+                else f"No data for {name} ({reason}) and no earlier dataset."
+            )
+
+        ended = time.perf_counter()
+        SCAN_PHASE_DURATION.observe(ended - started, phase="fetch")
+        record_span("fetch", started, ended)
+        return results
 
     def get_aggregated_media(self, config=None):
         """
         Orchestrates fetching data and matching it.
         """
+        return list(self.iter_aggregated_media(config=config))
+
+    def iter_aggregated_media(self, config=None):
+        """
+        Same as get_aggregated_media, but yields each MediaRecord as soon as its
+        match is final instead of building the whole list.
+        """
         if config is None:
-            config = {
-                "disk_threshold": 90,
-                "min_seed_weeks": 4,
-                "min_ratio": 1.0,
-            }
+            config = DEFAULT_RULES
 
         logger.info(f"Starting media sync with config: {config}")
+        scan_started = time.perf_counter()
 
-        # Check Disk Usage Logic Global
-        disk_usage = self.get_disk_usage()
-        current_disk_percent = disk_usage.get("percent", 0) if disk_usage else 0
-        is_disk_full_check = current_disk_percent >= float(
-            config.get("disk_threshold", 90)
-        )
+        # 1. Fetch data (all services at once)
+        sources = self._fetch_sources()
+        self.disk_usage = sources["disk_usage"]
 
-        # 1. Fetch data
-        radarr_movies = self.radarr.get_movies()
-        radarr_history = self.radarr.get_history(page_size=10000)
-        logger.info(f"Fetched {len(radarr_history)} history records from Radarr.")
-        sonarr_series = self.sonarr.get_series()
-        sonarr_history = self.sonarr.get_history(page_size=10000)
-        logger.info(f"Fetched {len(sonarr_history)} history records from Sonarr.")
+        # The disk rule is checked per volume
+        full = full_volumes(self.disk_usage, config)
 
-        qbit_torrents = self.qbit.get_torrents()
+        criteria_time = 0.0
+        for record in self._match_sources(sources):
+            started = time.perf_counter()
+            evaluate_record(record, config, full)
+            criteria_time += time.perf_counter() - started
+            yield record
 
-        # Index torrents by hash
-        torrents_by_hash = {t.get("hash", "").lower(): t for t in qbit_torrents}
-        logger.info(f"Fetched {len(qbit_torrents)} torrents from qBittorrent.")
+        SCAN_PHASE_DURATION.observe(criteria_time, phase="criteria")
+        SCAN_DURATION.observe(time.perf_counter() - scan_started)
 
-        # Index Radarr history hashes by MovieId
-        radarr_hashes = {}
-        for record in radarr_history:
-            m_id = record.get("movieId")
-            d_id = record.get("downloadId")
-            if m_id and d_id:
-                if m_id not in radarr_hashes:
-                    radarr_hashes[m_id] = set()
-                radarr_hashes[m_id].add(str(d_id).lower())
+    def get_matched_media(self):
+        """
+        Fetches and matches media without evaluating the deletability rules,
+        see services.rules. The disk usage fetched alongside is kept in
+        self.disk_usage.
+        """
+        scan_started = time.perf_counter()
+        sources = self._fetch_sources()
+        self.disk_usage = sources["disk_usage"]
+        media = list(self._match_sources(sources))
+        SCAN_DURATION.observe(time.perf_counter() - scan_started)
+        return media
+
+    def _match_sources(self, sources):
+        """
+        Pairs media with torrents and Jellyfin play status, yielding MediaRecords.
+        Phase metrics exclude the time spent by the consumer between items, while
+        profiling spans cover each loop's wall time.
+        """
+        started = time.perf_counter()
+        trace = current_trace()
+        radarr_movies = sources["radarr_movies"]
+        sonarr_series = sources["sonarr_series"]
 
+        # Download ids by MovieId / SeriesId, kept up to date incrementally
+        radarr_hashes = sources["radarr_history"]
         logger.info(f"Indexed {len(radarr_hashes)} movies with history in Radarr.")
+        sonarr_hashes = sources["sonarr_history"]
+        logger.info(f"Indexed {len(sonarr_hashes)} series with history in Sonarr.")
 
-        # Index Sonarr history hashes by SeriesId
-        sonarr_hashes = {}
-        for record in sonarr_history:
-            s_id = record.get("seriesId")
-            d_id = record.get("downloadId")
-            ep = record.get("episode")
-            if s_id and d_id:
-                d_id_str = str(d_id).lower()
-                if s_id not in sonarr_hashes:
-                    sonarr_hashes[s_id] = {}
+        qbit_torrents = sources["qbit_torrents"]
 
-                if d_id_str not in sonarr_hashes[s_id]:
-                    sonarr_hashes[s_id][d_id_str] = []
+        # Index torrents by hash
+        torrents_by_hash = {t.get("hash", "").lower(): t for t in qbit_torrents}
+        logger.info(f"Fetched {len(qbit_torrents)} torrents from qBittorrent.")
 
-                if ep:
-                    sonarr_hashes[s_id][d_id_str].append(ep)
+        # Index torrents by content path for the path fallback
+        torrents_by_path = TorrentPathIndex(qbit_torrents)
 
-        logger.info(f"Indexed {len(sonarr_hashes)} series with history in Sonarr.")
+        # (Type, provider, id) -> {"Watched": bool, "ItemIds": [...]}
+        jf_index = sources["jellyfin"]
 
-        # This returns a dict of ItemId -> ItemData with 'Watched' status
-        jf_data = self.jellyfin.get_all_items_with_play_status()
+        # Mount path holding each media path, for the per-volume disk rule
+        volumes = volume_index(sources.get("disk_usage"))
 
-        combined_results = []
+        processed = 0
+        # (origin, hash|path|none) -> items
+        match_counts = Counter()
+        ended = time.perf_counter()
+        SCAN_PHASE_DURATION.observe(ended - started, phase="index")
+        record_span("index", started, ended)
 
         # --- PROCESS MOVIES (Radarr) ---
+        movie_time = 0.0
+        loop_started = time.perf_counter()
         for movie in radarr_movies:
+            started = time.perf_counter()
             # Basic info
             has_file = movie.get("hasFile", False)
             monitored = movie.get("monitored", False)
@@ -124,113 +299,66 @@ class MatcherService:
             else:
                 lib_status = "Unmonitored"
 
-            entry = {
-                "id": movie.get("id"),
-                "origin": "Radarr",
-                "title": movie.get("title"),
-                "year": movie.get("year"),
-                "path": movie.get("path"),
-                "monitored": monitored,
-                "status": lib_status,
-                "file_loaded": has_file,
-                "torrent_state": "N/A",
-                "torrent_hashes": [],
-                "ratio": "N/A",
-                "seed_time": "N/A",
-                "watched": False,
-                "deletable": False,
-                "criteria": {},
-                "torrents": [],
-            }
-
-            raw_ratio = 0.0
-            raw_seed_time = 0
+            record = MediaRecord(
+                "Radarr", movie, lib_status, has_file, size=movie.get("sizeOnDisk")
+            )
+            record.volume = volumes.lookup(record.path)
 
             # Match Torrent
             # 1. Try Hash Match via History
             matched_torrent = None
+            match_method = "none"
             m_id = movie.get("id")
             if m_id in radarr_hashes:
                 for h in radarr_hashes[m_id]:
                     if h in torrents_by_hash:
                         matched_torrent = torrents_by_hash[h]
+                        match_method = "hash"
                         logger.info(f"Matched movie '{movie.get('title')}' by hash {h}")
                         break
 
             # 2. Fallback to Path Match
-            if not matched_torrent and entry["path"]:
-                movie_path = os.path.normpath(entry["path"]).lower()
-                for torrent in qbit_torrents:
-                    if "content_path" in torrent:
-                        t_path = os.path.normpath(torrent["content_path"]).lower()
-                        # Check for containment
-                        if movie_path in t_path or t_path in movie_path:
-                            matched_torrent = torrent
-                            logger.info(
-                                f"Matched movie '{movie.get('title')}' by path: {t_path}"
-                            )
-                            break
+            if not matched_torrent and record.path:
+                # Check for containment
+                matched_torrent = torrents_by_path.first_overlapping(record.path)
+                if matched_torrent:
+                    match_method = "path"
+                    logger.info(
+                        f"Matched movie '{movie.get('title')}' by path: {matched_torrent['content_path']}"
+                    )
 
             if matched_torrent:
-                entry["torrent_state"] = matched_torrent.get("state")
-                entry["torrent_hashes"] = [matched_torrent.get("hash")]
-                raw_ratio = matched_torrent.get("ratio", 0)
-                raw_seed_time = matched_torrent.get("seeding_time", 0)
-                entry["ratio"] = f"{raw_ratio:.2f}"
-                entry["seed_time"] = self._format_seed_time(raw_seed_time)
-
-                entry["torrents"] = [
-                    {
-                        "hash": matched_torrent.get("hash"),
-                        "name": matched_torrent.get("name"),
-                        "label": "Movie",
-                        "state": matched_torrent.get("state"),
-                        "ratio": f"{raw_ratio:.2f}",
-                        "seed_time": self._format_seed_time(raw_seed_time),
-                    }
-                ]
+                record.set_torrents([TorrentRecord(matched_torrent, "Movie")])
 
             # Match Jellyfin
             m_tmdb = str(movie.get("tmdbId", ""))
             m_imdb = str(movie.get("imdbId", ""))
 
             is_watched = False
-            for jf_item in jf_data.values():
-                if jf_item.get("Type") != "Movie":
-                    continue
-
-                p_ids = jf_item.get("ProviderIds", {})
-                jf_tmdb = str(p_ids.get("Tmdb", ""))
-                jf_imdb = str(p_ids.get("Imdb", ""))
-
-                if (m_tmdb and m_tmdb == jf_tmdb) or (m_imdb and m_imdb == jf_imdb):
-                    if jf_item.get("Watched"):
-                        is_watched = True
+            for key in (("Movie", "Tmdb", m_tmdb), ("Movie", "Imdb", m_imdb)):
+                jf_entry = jf_index.get(key)
+                if jf_entry and jf_entry["Watched"]:
+                    is_watched = True
                     break
 
-            entry["watched"] = is_watched
+            record.watched = is_watched
+            match_counts["Radarr", match_method] += 1
 
-            # Deletability Logic
-            weeks_seconds = float(config.get("min_seed_weeks", 4)) * 7 * 24 * 3600
-
-            # Check criteria
-            c_disk = is_disk_full_check
-            c_watched = is_watched
-            c_time = raw_seed_time >= weeks_seconds
-            c_ratio = raw_ratio >= float(config.get("min_ratio", 1.0))
-
-            entry["deletable"] = c_disk and c_watched and c_time and c_ratio
-            entry["criteria"] = {
-                "disk": c_disk,
-                "watched": c_watched,
-                "time": c_time,
-                "ratio": c_ratio,
-            }
+            processed += 1
+            item_time = time.perf_counter() - started
+            movie_time += item_time
+            if trace is not None:
+                trace.add_item(item_time, origin="Radarr", id=record.id, title=record.title)
+            yield record
 
-            combined_results.append(entry)
+        SCAN_PHASE_DURATION.observe(movie_time, phase="movie_match")
+        record_span("movie_match", loop_started, time.perf_counter())
 
         # --- PROCESS SERIES (Sonarr) ---
+        series_time = 0.0
+        loop_started = time.perf_counter()
         for show in sonarr_series:
+            started = time.perf_counter()
             stats = show.get("statistics", {})
             ep_count = stats.get("episodeCount", 0)
             file_count = stats.get("episodeFileCount", 0)
@@ -246,34 +374,18 @@ class MatcherService:
 
             # Determine Watched Status (Show Level)
             s_tvdb = str(show.get("tvdbId", ""))
-            is_watched = False
-            for jf_item in jf_data.values():
-                if jf_item.get("Type") == "Series":
-                    p_ids = jf_item.get("ProviderIds", {})
-                    jf_tvdb = str(p_ids.get("Tvdb", ""))
-                    if s_tvdb and s_tvdb == jf_tvdb:
-                        if jf_item.get("Watched"):
-                            is_watched = True
-                        break
-
-            entry = {
-                "id": show.get("id"),
-                "origin": "Sonarr",
-                "title": show.get("title"),
-                "year": show.get("year"),
-                "path": show.get("path"),
-                "monitored": show.get("monitored"),
-                "status": lib_status,
-                "file_loaded": file_count > 0,
-                "torrent_state": "N/A",
-                "torrent_hashes": [],
-                "ratio": "N/A",
-                "seed_time": "N/A",
-                "watched": is_watched,
-                "deletable": False,
-                "criteria": {},
-                "torrents": [],
-            }
+            jf_entry = jf_index.get(("Series", "Tvdb", s_tvdb))
+            is_watched = bool(jf_entry and jf_entry["Watched"])
+
+            record = MediaRecord(
+                "Sonarr",
+                show,
+                lib_status,
+                file_count > 0,
+                size=stats.get("sizeOnDisk"),
+                watched=is_watched,
+            )
+            record.volume = volumes.lookup(record.path)
 
             # Match Torrents
             matched_torrents_list = []
@@ -316,21 +428,16 @@ class MatcherService:
                             f"Matched series '{show.get('title')}' by hash {h} (state: {t.get('state')})"
                         )
 
-            # 2. Fallback to Path Match
-            if not matched_torrents_list and base_entry["path"]:
-                show_path = os.path.normpath(base_entry["path"]).lower()
-                for torrent in qbit_torrents:
-                    if "content_path" in torrent:
-                        t_path = os.path.normpath(torrent["content_path"]).lower()
-                        if show_path in t_path:
-                            matched_torrents_list.append(torrent)
-                            logger.info(
-                                f"Matched series '{show.get('title')}' by path: {t_path}"
-                            )
+            match_method = "hash" if matched_torrents_list else "none"
 
-            weeks_seconds = float(config.get("min_seed_weeks", 4)) * 7 * 24 * 3600
-            c_disk = is_disk_full_check
-            c_watched = is_watched
+            # 2. Fallback to Path Match
+            if not matched_torrents_list and record.path:
+                for torrent in torrents_by_path.containing(record.path):
+                    matched_torrents_list.append(torrent)
+                    match_method = "path"
+                    logger.info(
+                        f"Matched series '{show.get('title')}' by path: {torrent['content_path']}"
+                    )
 
             if matched_torrents_list:
                 # Parse labels first to handle collisions
@@ -358,9 +465,6 @@ class MatcherService:
 
                 label_counts = Counter([l for l in labels if l])
                 torrents_data = []
-                all_ratios = []
-                all_seed_times = []
-                all_states = set()
 
                 for i, t in enumerate(matched_torrents_list):
                     t_name = t.get("name", "")
@@ -371,118 +475,32 @@ class MatcherService:
                     elif lbl:
                         display_label = f"{lbl} ({t_name})"
 
-                    raw_ratio = t.get("ratio", 0)
-                    raw_seed_time = t.get("seeding_time", 0)
-
-                    all_ratios.append(raw_ratio)
-                    all_seed_times.append(raw_seed_time)
-                    all_states.add(t.get("state"))
-
-                    t_entry = {
-                        "hash": t.get("hash"),
-                        "name": t_name,
-                        "label": display_label,
-                        "state": t.get("state"),
-                        "ratio_raw": raw_ratio,
-                        "ratio": f"{raw_ratio:.2f}",
-                        "seed_time_raw": raw_seed_time,
-                        "seed_time": self._format_seed_time(raw_seed_time),
-                    }
-                    torrents_data.append(t_entry)
-
-                # Aggregated Stats
-                entry["torrents"] = torrents_data
-                entry["torrent_hashes"] = [t["hash"] for t in torrents_data]
-                entry["torrent_state"] = ", ".join(list(all_states))
-
-                avg_ratio = sum(all_ratios) / len(all_ratios) if all_ratios else 0
-                max_time = max(all_seed_times) if all_seed_times else 0
-                min_time = min(all_seed_times) if all_seed_times else 0
-
-                entry["ratio"] = f"Avg: {avg_ratio:.2f}"
-                entry["seed_time"] = f"Max: {self._format_seed_time(max_time)}"
-
-                # Series Deletability: Use Min Time and Avg Ratio
-                c_time = min_time >= weeks_seconds
-                c_ratio = avg_ratio >= float(config.get("min_ratio", 1.0))
-
-                entry["deletable"] = c_disk and c_watched and c_time and c_ratio
-                entry["criteria"] = {
-                    "disk": c_disk,
-                    "watched": c_watched,
-                    "time": c_time,
-                    "ratio": c_ratio,
-                }
-            else:
-                # No torrents found
-                entry["deletable"] = False
-                entry["criteria"] = {
-                    "disk": c_disk,
-                    "watched": c_watched,
-                    "time": False,
-                    "ratio": False,
-                }
+                    torrents_data.append(TorrentRecord(t, display_label))
 
-            combined_results.append(entry)
+                # Aggregated Stats (average ratio, min/max seed time)
+                record.set_torrents(torrents_data)
 
-        logger.info(f"Processed {len(combined_results)} media items.")
-        return combined_results
+            match_counts["Sonarr", match_method] += 1
 
-    def get_disk_usage(self):
-        disks = self.radarr.get_disk_space()
-        if not disks:
-            return None
-
-        target_disk = None
-
-        # 1. Try to match against Radarr Root Folder
-        root_folders = self.radarr.get_root_folders()
-        if root_folders:
-            rf_path = root_folders[0].get("path", "")
-
-            # Find the disk mount that contains this root folder
-            best_match = None
-            max_len = -1
-
-            for d in disks:
-                d_path = d.get("path", "")
-                if rf_path.startswith(d_path):
-                    if len(d_path) > max_len:
-                        max_len = len(d_path)
-                        best_match = d
-
-            if best_match:
-                target_disk = best_match
-
-        # 2. Fallback to hardcoded /media
-        if not target_disk:
-            for d in disks:
-                if d.get("path") == "/media":
-                    target_disk = d
-                    break
+            processed += 1
+            item_time = time.perf_counter() - started
+            series_time += item_time
+            if trace is not None:
+                trace.add_item(item_time, origin="Sonarr", id=record.id, title=record.title)
+            yield record
 
-        # 3. Fallback to first disk
-        if not target_disk and disks:
-            target_disk = disks[0]
-
-        if target_disk:
-            free = target_disk.get("freeSpace", 0)
-            total = target_disk.get("totalSpace", 0)
-            used = total - free
-            percent = (used / total * 100) if total > 0 else 0
-
-            return {
-                "path": target_disk.get("path"),
-                "free": self._format_bytes(free),
-                "total": self._format_bytes(total),
-                "percent": round(percent, 2),
-            }
-        return None
+        SCAN_PHASE_DURATION.observe(series_time, phase="series_match")
+        record_span("series_match", loop_started, time.perf_counter())
+        for (origin, method), count in match_counts.items():
+            MEDIA_MATCHES.inc(count, origin=origin, method=method)
+        SCANNED_ITEMS.set(len(radarr_movies), origin="Radarr")
+        SCANNED_ITEMS.set(len(sonarr_series), origin="Sonarr")
+        logger.info(f"Processed {processed} media items.")
+
+    def get_disk_usage(self):
+        """Disk usage of the media volumes, cached for DISK_USAGE_TTL (see services.disk_usage)."""
+        return DiskUsageService().get(self.radarr, self.sonarr)
 
     def get_service_statuses(self):
-        return {
-            "Radarr": self.radarr.check_connection(),
-            "Sonarr": self.sonarr.check_connection(),
-            "qBittorrent": self.qbit.check_connection(),
-            "Jellyfin": self.jellyfin.check_connection(),
-        }
+        """Online status per service from the background prober (services.health)."""
+        return HealthMonitor().statuses()
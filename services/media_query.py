@@ -0,0 +1,153 @@
+SORT_FIELDS = (
+    "title",
+    "origin",
+    "year",
+    "status",
+    "watched",
+    "deletable",
+    "ratio",
+    "seed_time",
+)
+
+# Sort orders that change with the deletability rules
+RULE_SORT_FIELDS = ("deletable",)
+
+# Items without torrents (ratio/seed time of None) sort first
+_SORT_KEYS = {
+    "title": lambda item: (item.title or "").lower(),
+    "origin": lambda item: item.origin or "",
+    "year": lambda item: item.year or 0,
+    "status": lambda item: item.status or "",
+    "watched": lambda item: bool(item.watched),
+    "deletable": lambda item: bool(item.deletable),
+    "ratio": lambda item: -1.0 if item.ratio is None else item.ratio,
+    "seed_time": lambda item: -1 if item.seed_time is None else item.seed_time,
+}
+
+
+def build_sort_index(media, reuse=None):
+    """
+    Precomputes, for every sortable field, the item positions in ascending order.
+    Ties are broken by title then id so pages are stable between requests.
+    Orders found in `reuse` (computed for the same items) are kept as they are.
+    """
+    reuse = reuse or {}
+    tie_breaker = [
+        ((item.title or "").lower(), str(item.id)) for item in media
+    ]
+    orders = {}
+    for field, key in _SORT_KEYS.items():
+        if field in reuse:
+            orders[field] = reuse[field]
+            continue
+        keys = [key(item) for item in media]
+        orders[field] = sorted(
+            range(len(media)), key=lambda i: (keys[i], tie_breaker[i])
+        )
+    return orders
+
+
+ORIGINS = ("Radarr", "Sonarr")
+# Larger limits are clamped; without a limit every matching item is returned
+MAX_LIMIT = 1000
+
+_TRUE = ("1", "true", "yes")
+_FALSE = ("0", "false", "no")
+
+
+def _parse_bool(name, value):
+    if value is None or value == "":
+        return None
+    if value.lower() in _TRUE:
+        return True
+    if value.lower() in _FALSE:
+        return False
+    raise ValueError(f"Invalid {name} {value!r}, expected true or false")
+
+
+def _parse_int(name, value):
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f"Invalid {name} {value!r}, expected an integer") from None
+    if number < 0:
+        raise ValueError(f"Invalid {name} {value!r}, expected 0 or more")
+    return number
+
+
+def parse_query(args):
+    """
+    Validates the request args of query_media() and returns them parsed.
+    Raises ValueError on an invalid value.
+    """
+    sort = args.get("sort") or "title"
+    if sort not in SORT_FIELDS:
+        raise ValueError(
+            f"Invalid sort {sort!r}, expected one of {', '.join(SORT_FIELDS)}"
+        )
+    order = args.get("order") or "asc"
+    if order not in ("asc", "desc"):
+        raise ValueError(f"Invalid order {order!r}, expected asc or desc")
+    origin = args.get("origin") or None
+    if origin is not None and origin not in ORIGINS:
+        raise ValueError(
+            f"Invalid origin {origin!r}, expected one of {', '.join(ORIGINS)}"
+        )
+    offset = args.get("offset")
+    limit = args.get("limit")
+    return {
+        "sort": sort,
+        "descending": order == "desc",
+        "origin": origin,
+        "deletable": _parse_bool("deletable", args.get("deletable")),
+        "watched": _parse_bool("watched", args.get("watched")),
+        "q": (args.get("q") or "").strip().lower(),
+        "offset": _parse_int("offset", offset) if offset else 0,
+        "limit": min(_parse_int("limit", limit), MAX_LIMIT) if limit else None,
+    }
+
+
+def query_media(media, orders, query):
+    """
+    Filters, sorts and pages `media` (MediaRecords) according to `query`, parsed
+    by parse_query() from the request args: offset, limit, sort (one of
+    SORT_FIELDS), order (asc|desc), origin, deletable, watched and q
+    (case-insensitive title search).
+    """
+    sort = query["sort"]
+    descending = query["descending"]
+    origin = query["origin"]
+    deletable = query["deletable"]
+    watched = query["watched"]
+    q = query["q"]
+    offset = query["offset"]
+    limit = query["limit"]
+
+    positions = orders[sort]
+    if descending:
+        positions = reversed(positions)
+
+    matched = []
+    for i in positions:
+        item = media[i]
+        if origin and item.origin != origin:
+            continue
+        if deletable is not None and bool(item.deletable) != deletable:
+            continue
+        if watched is not None and bool(item.watched) != watched:
+            continue
+        if q and q not in (item.title or "").lower():
+            continue
+        matched.append(item)
+
+    end = offset + limit if limit is not None else None
+    return {
+        "media": matched[offset:end],
+        "page": {
+            "offset": offset,
+            "limit": limit,
+            "total": len(matched),
+            "sort": sort,
+            "order": "desc" if descending else "asc",
+        },
+    }
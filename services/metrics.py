@@ -0,0 +1,321 @@
+"""
+Minimal Prometheus metrics (text exposition format 0.0.4), served on /metrics.
+
+Metrics are process-local and thread-safe. Labels are passed as keyword
+arguments and must match the label names the metric was declared with. A
+multi-worker server renders the dumps of all its processes together (see
+services.shared_metrics).
+"""
+
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in pairs) + "}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def dump(self):
+        """JSON-serialisable values of every metric, for render() in another process."""
+        with self._lock:
+            metrics = list(self._metrics)
+        return {metric.name: metric.dump() for metric in metrics}
+
+    def render(self, workers=None):
+        """
+        Renders every metric. With `workers`, a list of (pid, alive, dump()) of
+        the processes of a server, counters and histograms are summed over all of
+        them (exited ones included, so they never go down) and gauges get a worker
+        label, for live processes only.
+        """
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics)
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            if workers is None:
+                lines.extend(metric.samples())
+            else:
+                lines.extend(metric.merged_samples(workers))
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def dump(self):
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        return self._lines(values, self.labelnames)
+
+    def merged_samples(self, workers):
+        values = {}
+        for _, _, dump in workers:
+            for key, value in dump.get(self.name, []):
+                key = tuple(key)
+                values[key] = values.get(key, 0) + value
+        return self._lines(values, self.labelnames)
+
+    def _lines(self, values, labelnames):
+        return [
+            f"{self.name}{_format_labels(labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(values.items())
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def merged_samples(self, workers):
+        # Values of different processes do not add up
+        values = {}
+        for pid, alive, dump in workers:
+            if alive:
+                for key, value in dump.get(self.name, []):
+                    values[tuple(key) + (str(pid),)] = value
+        return self._lines(values, self.labelnames + ("worker",))
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, **kwargs):
+        super().__init__(name, documentation, labelnames, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts (last one is +Inf), sum
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def dump(self):
+        with self._lock:
+            return [[list(key), [list(s[0]), s[1]]] for key, s in self._values.items()]
+
+    def samples(self):
+        with self._lock:
+            values = {k: (list(s[0]), s[1]) for k, s in self._values.items()}
+        return self._lines(values)
+
+    def merged_samples(self, workers):
+        values = {}
+        for _, _, dump in workers:
+            for key, (counts, total) in dump.get(self.name, []):
+                key = tuple(key)
+                merged = values.get(key)
+                if merged is None:
+                    values[key] = (list(counts), total)
+                else:
+                    counts = [a + b for a, b in zip(merged[0], counts)]
+                    values[key] = (counts, merged[1] + total)
+        return self._lines(values)
+
+    def _lines(self, values):
+        lines = []
+        for key, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(float(bound))))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+# --- Upstream calls (see services.http) ---
+
+UPSTREAM_REQUESTS = Counter(
+    "media_cleanerr_upstream_requests_total",
+    "Requests to upstream services by status code ('error' when no response, "
+    "'circuit_open' when not sent).",
+    ("service", "method", "endpoint", "status"),
+)
+UPSTREAM_LATENCY = Histogram(
+    "media_cleanerr_upstream_request_duration_seconds",
+    "Upstream request duration, including reading the body.",
+    ("service", "method", "endpoint"),
+)
+UPSTREAM_RESPONSE_SIZE = Histogram(
+    "media_cleanerr_upstream_response_size_bytes",
+    "Upstream response body size.",
+    ("service", "endpoint"),
+    buckets=SIZE_BUCKETS,
+)
+
+# --- Service health (see services.breaker and services.health) ---
+
+SERVICE_UP = Gauge(
+    "media_cleanerr_service_up",
+    "Result of the last health probe (1 online, 0 offline).",
+    ("service",),
+)
+CIRCUIT_STATE = Gauge(
+    "media_cleanerr_circuit_state",
+    "Circuit breaker state per service (0 closed, 1 half-open, 2 open).",
+    ("service",),
+)
+CIRCUIT_TRANSITIONS = Counter(
+    "media_cleanerr_circuit_transitions_total",
+    "Circuit breaker state changes by new state.",
+    ("service", "state"),
+)
+
+# --- Scans ---
+
+SCAN_DURATION = Histogram(
+    "media_cleanerr_scan_duration_seconds",
+    "Duration of complete scans (fetch and match).",
+)
+SCAN_PHASE_DURATION = Histogram(
+    "media_cleanerr_scan_phase_duration_seconds",
+    "Scan time spent per phase: fetch, index, movie_match, series_match, criteria.",
+    ("phase",),
+)
+MEDIA_MATCHES = Counter(
+    "media_cleanerr_media_matches_total",
+    "Matched media items by how their torrents were found (hash, path or none).",
+    ("origin", "method"),
+)
+STALE_SOURCES = Counter(
+    "media_cleanerr_stale_sources_total",
+    "Scan sources served from their last-known dataset, by reason (timeout or error).",
+    ("source", "reason"),
+)
+SCANNED_ITEMS = Gauge(
+    "media_cleanerr_scanned_items",
+    "Items in the last scan.",
+    ("origin",),
+)
+
+# --- Caches ---
+
+SNAPSHOT_REQUESTS = Counter(
+    "media_cleanerr_snapshot_requests_total",
+    "Snapshot cache lookups: hit, stale (served while refreshing), "
+    "reevaluated (rules changed), miss or forced (?refresh=1).",
+    ("result",),
+)
+SNAPSHOT_BUILDS = Counter(
+    "media_cleanerr_snapshot_builds_total",
+    "Snapshot refreshes that built a snapshot (built) or waited for one in flight (joined).",
+    ("result",),
+)
+CONDITIONAL_RESPONSES = Counter(
+    "media_cleanerr_conditional_responses_total",
+    "Dashboard API responses by ETag outcome (not_modified or full).",
+    ("result",),
+)
+QBIT_SYNCS = Counter(
+    "media_cleanerr_qbit_syncs_total",
+    "qBittorrent torrent list syncs by kind (full or delta).",
+    ("kind",),
+)
+HISTORY_RECORDS = Counter(
+    "media_cleanerr_history_records_synced_total",
+    "New history records fetched by incremental history syncs.",
+    ("source",),
+)
+
+# --- Deletions ---
+
+DELETED_ITEMS = Counter(
+    "media_cleanerr_deleted_items_total",
+    "Items processed by deletions, by result (ok or failed).",
+    ("origin", "result"),
+)
+DELETION_BATCH_DURATION = Histogram(
+    "media_cleanerr_deletion_batch_duration_seconds",
+    "Duration of one deletion batch (torrents and media).",
+)
+DELETION_JOBS = Counter(
+    "media_cleanerr_deletion_jobs_total",
+    "Finished deletion jobs by final status.",
+    ("status",),
+)
@@ -0,0 +1,113 @@
+import bisect
+import os
+
+
+def normalise_path(path):
+    return os.path.normpath(path).lower()
+
+
+class TorrentPathIndex:
+    """
+    Index over the torrents' normalised content_path, built once per scan.
+
+    Answers the containment checks of the path fallback with the same semantics
+    as `a in b` on normalised, lower-cased paths, without visiting every torrent:
+    - containing(path): torrents whose content path contains `path`
+    - contained_in(path): torrents whose content path is contained in `path`
+
+    An absolute path can only occur in another string at a separator, so every
+    match starts at a component boundary. Each torrent path is stored once per
+    component-start suffix in a sorted table (for `path in t_path`), and the
+    distinct absolute paths in a second sorted table (for `t_path in path`).
+    Relative paths, which can match anywhere, are checked linearly.
+    """
+
+    def __init__(self, torrents):
+        self.torrents = []
+        self.paths = []
+        self._suffixes = []
+        self._positions = {}
+        self._relative = []
+
+        for torrent in torrents:
+            if "content_path" not in torrent:
+                continue
+            t_path = normalise_path(torrent["content_path"])
+            pos = len(self.torrents)
+            self.torrents.append(torrent)
+            self.paths.append(t_path)
+
+            for i, char in enumerate(t_path):
+                if char == os.sep:
+                    self._suffixes.append((t_path[i:], pos))
+
+            if t_path.startswith(os.sep):
+                self._positions.setdefault(t_path, []).append(pos)
+            else:
+                self._relative.append((t_path, pos))
+
+        self._suffixes.sort()
+        self._sorted_paths = sorted(self._positions)
+
+    def __len__(self):
+        return len(self.torrents)
+
+    def _containing_positions(self, path):
+        if not path.startswith(os.sep):
+            return {pos for pos, t_path in enumerate(self.paths) if path in t_path}
+
+        positions = set()
+        start = bisect.bisect_left(self._suffixes, (path,))
+        for suffix, pos in self._suffixes[start:]:
+            if not suffix.startswith(path):
+                break
+            positions.add(pos)
+        return positions
+
+    def _prefixes_of(self, s):
+        """Yields every indexed absolute path that is a prefix of `s`."""
+        paths = self._sorted_paths
+        hi = len(paths)
+        while s and hi:
+            k = bisect.bisect_right(paths, s, 0, hi) - 1
+            if k < 0:
+                break
+            candidate = paths[k]
+            if s.startswith(candidate):
+                yield candidate
+                # Any other prefix is shorter, hence sorts before the candidate
+                s = candidate[:-1]
+                hi = k
+            else:
+                # Any other prefix must also be a prefix of the common part
+                s = os.path.commonprefix((candidate, s))
+                hi = k + 1
+
+    def _contained_in_positions(self, path):
+        positions = {pos for t_path, pos in self._relative if t_path in path}
+        for i, char in enumerate(path):
+            if char != os.sep:
+                continue
+            for t_path in self._prefixes_of(path[i:]):
+                positions.update(self._positions[t_path])
+        return positions
+
+    def containing(self, path):
+        """Torrents whose content path contains `path`, in qBittorrent order."""
+        positions = self._containing_positions(normalise_path(path))
+        return [self.torrents[pos] for pos in sorted(positions)]
+
+    def contained_in(self, path):
+        """Torrents whose content path is contained in `path`, in qBittorrent order."""
+        positions = self._contained_in_positions(normalise_path(path))
+        return [self.torrents[pos] for pos in sorted(positions)]
+
+    def first_overlapping(self, path):
+        """First torrent whose content path contains or is contained in `path`."""
+        path = normalise_path(path)
+        positions = self._containing_positions(path) | self._contained_in_positions(
+            path
+        )
+        if not positions:
+            return None
+        return self.torrents[min(positions)]
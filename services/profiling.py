@@ -0,0 +1,168 @@
+"""
+Opt-in scan profiling.
+
+Code marks interesting sections with `with span("name"):`. Spans are only
+recorded while a Trace is active in the current context (see `tracing()`);
+otherwise span() returns a shared no-op context manager, so instrumented code
+pays for one ContextVar lookup.
+
+Thread pools do not inherit the context by themselves: submit work through
+`in_context(fn)` to keep the worker's spans in the caller's trace.
+
+A trace is exported in the Chrome trace event format ("X" complete events),
+which chrome://tracing, Perfetto and speedscope show as a flame graph.
+"""
+
+import contextvars
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+MAX_SLOW_ITEMS = 20
+
+_current_trace = contextvars.ContextVar("profile_trace", default=None)
+
+
+class Trace:
+    def __init__(self, name="scan", max_slow_items=MAX_SLOW_ITEMS):
+        self.name = name
+        self.started = time.perf_counter()
+        self.started_at = time.time()
+        self.max_slow_items = max_slow_items
+        self._events = []
+        self._slow_items = []  # min-heap of (seconds, seq, item)
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def add_span(self, name, started, ended, args=None):
+        event = {
+            "name": name,
+            "ph": "X",
+            "ts": round((started - self.started) * 1e6, 1),
+            "dur": round((ended - started) * 1e6, 1),
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+        }
+        if args:
+            event["args"] = args
+        with self._lock:
+            self._events.append(event)
+
+    def add_item(self, seconds, **item):
+        """Keeps the slowest items seen (per-item matching time)."""
+        entry = (seconds, next(self._seq), item)
+        with self._lock:
+            if len(self._slow_items) < self.max_slow_items:
+                heapq.heappush(self._slow_items, entry)
+            elif seconds > self._slow_items[0][0]:
+                heapq.heapreplace(self._slow_items, entry)
+
+    def slow_items(self):
+        with self._lock:
+            entries = sorted(self._slow_items, reverse=True)
+        return [{**item, "ms": round(seconds * 1000, 3)} for seconds, _, item in entries]
+
+    def to_chrome(self):
+        """Chrome trace event format, with thread names as metadata events."""
+        with self._lock:
+            events = list(self._events)
+        names = {t.ident: t.name for t in threading.enumerate()}
+        metadata = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": os.getpid(),
+                "tid": tid,
+                "args": {"name": names.get(tid, str(tid))},
+            }
+            for tid in sorted({e["tid"] for e in events})
+        ]
+        return {"traceEvents": metadata + events, "displayTimeUnit": "ms"}
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": round((time.perf_counter() - self.started) * 1000, 3),
+            "slow_items": self.slow_items(),
+            "trace": self.to_chrome(),
+        }
+
+
+class _Span:
+    __slots__ = ("trace", "name", "args", "started")
+
+    def __init__(self, trace, name, args):
+        self.trace = trace
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        args = self.args
+        if exc_type is not None:
+            args = {**(args or {}), "error": exc_type.__name__}
+        self.trace.add_span(self.name, self.started, time.perf_counter(), args)
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def span(name, **args):
+    trace = _current_trace.get()
+    if trace is None:
+        return _NO_SPAN
+    return _Span(trace, name, args or None)
+
+
+def record_span(name, started, ended, **args):
+    """Records an already timed section (perf_counter values) as a span."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_span(name, started, ended, args or None)
+
+
+def in_context(fn):
+    """
+    Wraps fn to run in the caller's context from pool threads. Each call gets its
+    own copy, since one context cannot be entered by two threads at once.
+    """
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        return context.copy().run(fn, *args, **kwargs)
+
+    return run
+
+
+@contextmanager
+def tracing(name="scan"):
+    """Records spans of the enclosed code (and of work it hands to in_context) into a new Trace."""
+    trace = Trace(name)
+    token = _current_trace.set(trace)
+    try:
+        with span(name):
+            yield trace
+    finally:
+        _current_trace.reset(token)
@@ -1,19 +1,62 @@
 import logging
-
-import requests
+import threading
 
 from services.config_manager import ConfigManager
+from services.http import get_session
+from services.metrics import QBIT_SYNCS
 
 logger = logging.getLogger(__name__)
 
 
+class TorrentTable:
+    """
+    In-memory mirror of a qBittorrent instance's torrents, kept current by applying
+    /api/v2/sync/maindata responses. One table per host, shared by all clients.
+    """
+
+    _tables = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self):
+        self.rid = 0
+        self.torrents = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def for_host(cls, host):
+        with cls._registry_lock:
+            if host not in cls._tables:
+                cls._tables[host] = cls()
+            return cls._tables[host]
+
+    def apply(self, data):
+        if data.get("full_update"):
+            self.torrents = {}
+
+        for t_hash, fields in (data.get("torrents") or {}).items():
+            # Replace rather than mutate so lists handed out earlier stay consistent
+            current = self.torrents.get(t_hash, {"hash": t_hash})
+            self.torrents[t_hash] = {**current, **fields}
+
+        for t_hash in data.get("torrents_removed") or []:
+            self.torrents.pop(t_hash, None)
+
+        self.rid = data.get("rid", self.rid)
+
+    def values(self):
+        return list(self.torrents.values())
+
+
 class QBitClient:
+    CONFIG_KEYS = ("QBIT_HOST", "QBIT_USERNAME", "QBIT_PASSWORD")
+
     def __init__(self):
         config = ConfigManager()
         self.host = config.get("QBIT_HOST")
         self.username = config.get("QBIT_USERNAME")
         self.password = config.get("QBIT_PASSWORD")
-        self.session = requests.Session()
+        # Shared session, so the auth cookie survives across requests
+        self.session = get_session("qbittorrent")
         self.authenticated = False
 
     def login(self):
@@ -70,6 +113,50 @@ class QBitClient:
             logger.error(f"Error fetching torrents from qBittorrent: {e}")
             return []
 
+    def sync_torrents(self):
+        """
+        Returns the torrent list from the live table after applying the changes
+        since the last sync. Falls back to the last known table on errors.
+        """
+        if not self.host:
+            return []
+
+        if not self.authenticated:
+            if not self.login():
+                return []
+
+        table = TorrentTable.for_host(self.host)
+        with table.lock:
+            try:
+                base_url = self.host.rstrip("/")
+                url = f"{base_url}/api/v2/sync/maindata"
+
+                response = self.session.get(
+                    url, params={"rid": table.rid}, timeout=(5, 60)
+                )
+
+                # If 403, maybe session expired? Try relogin once.
+                if response.status_code == 403:
+                    logger.info("Session expired, retrying login...")
+                    if self.login():
+                        response = self.session.get(
+                            url, params={"rid": table.rid}, timeout=(5, 60)
+                        )
+                    else:
+                        return table.values()
+
+                response.raise_for_status()
+                data = response.json()
+                table.apply(data)
+                QBIT_SYNCS.inc(kind="full" if data.get("full_update") else "delta")
+                logger.info(
+                    f"Synced qBittorrent torrents (rid {table.rid}, full_update={bool(data.get('full_update'))})."
+                )
+            except Exception as e:
+                logger.error(f"Error syncing torrents from qBittorrent: {e}")
+
+            return table.values()
+
     def delete_torrent(self, torrent_hash):
         if not self.host or not torrent_hash:
             return False
@@ -92,5 +179,44 @@ class QBitClient:
             logger.error(f"Error deleting torrent {torrent_hash}: {e}")
             return False
 
+    def delete_torrents(self, torrent_hashes):
+        """Deletes several torrents (and their content) in a single request."""
+        torrent_hashes = [h for h in torrent_hashes if h]
+        if not self.host or not torrent_hashes:
+            return False
+
+        if not self.authenticated:
+            if not self.login():
+                return False
+
+        try:
+            base_url = self.host.rstrip("/")
+            url = f"{base_url}/api/v2/torrents/delete"
+            # qBittorrent accepts pipe-separated hashes
+            data = {"hashes": "|".join(torrent_hashes), "deleteFiles": "true"}
+
+            response = self.session.post(url, data=data, timeout=(5, 120))
+            response.raise_for_status()
+            logger.info(f"Deleted {len(torrent_hashes)} torrents from qBittorrent.")
+            return True
+        except Exception as e:
+            logger.error(f"Error deleting {len(torrent_hashes)} torrents: {e}")
+            return False
+
     def check_connection(self):
+        if not self.host:
+            return False
+
+        # Reuse the session cookie; only log in again if it is missing or expired
+        if self.authenticated:
+            try:
+                base_url = self.host.rstrip("/")
+                url = f"{base_url}/api/v2/app/version"
+                response = self.session.get(url, timeout=5)
+                if response.status_code != 403:
+                    response.raise_for_status()
+                    return True
+            except Exception:
+                pass
+
         return self.login()
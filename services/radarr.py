@@ -1,17 +1,19 @@
 import logging
 
-import requests
-
 from services.config_manager import ConfigManager
+from services.http import get_session
 
 logger = logging.getLogger(__name__)
 
 
 class RadarrClient:
+    CONFIG_KEYS = ("RADARR_HOST", "RADARR_API_KEY")
+
     def __init__(self):
         config = ConfigManager()
         self.host = config.get("RADARR_HOST")
         self.api_key = config.get("RADARR_API_KEY")
+        self.session = get_session("radarr")
 
     def get_movies(self):
         if not self.host or not self.api_key:
@@ -23,7 +25,7 @@ class RadarrClient:
             url = f"{base_url}/api/v3/movie"
             headers = {"X-Api-Key": self.api_key}
 
-            response = requests.get(url, headers=headers, timeout=(5, 60))
+            response = self.session.get(url, headers=headers, timeout=(5, 60))
             response.raise_for_status()
             return response.json()
         except Exception as e:
@@ -40,7 +42,7 @@ class RadarrClient:
             headers = {"X-Api-Key": self.api_key}
             params = {"pageSize": page_size}
 
-            response = requests.get(
+            response = self.session.get(
                 url, headers=headers, params=params, timeout=(5, 60)
             )
             response.raise_for_status()
@@ -49,6 +51,31 @@ class RadarrClient:
             logger.error(f"Error fetching history from Radarr: {e}")
             return []
 
+    def get_history_page(self, page=1, page_size=1000):
+        """Fetch one page of history, newest first. Returns the raw page or None on error."""
+        if not self.host or not self.api_key:
+            return None
+
+        try:
+            base_url = self.host.rstrip("/")
+            url = f"{base_url}/api/v3/history"
+            headers = {"X-Api-Key": self.api_key}
+            params = {
+                "page": page,
+                "pageSize": page_size,
+                "sortKey": "id",
+                "sortDirection": "descending",
+            }
+
+            response = self.session.get(
+                url, headers=headers, params=params, timeout=(5, 60)
+            )
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            logger.error(f"Error fetching history page {page} from Radarr: {e}")
+            return None
+
     def delete_movie(self, movie_id):
         if not self.host or not self.api_key:
             return False
@@ -59,7 +86,7 @@ class RadarrClient:
             headers = {"X-Api-Key": self.api_key}
             params = {"deleteFiles": "true"}
 
-            response = requests.delete(
+            response = self.session.delete(
                 url, headers=headers, params=params, timeout=(5, 60)
             )
             response.raise_for_status()
@@ -69,6 +96,27 @@ class RadarrClient:
             logger.error(f"Error deleting movie {movie_id} from Radarr: {e}")
             return False
 
+    def bulk_delete_movies(self, movie_ids):
+        """Deletes several movies (and their files) through the movie editor endpoint."""
+        if not self.host or not self.api_key or not movie_ids:
+            return False
+
+        try:
+            base_url = self.host.rstrip("/")
+            url = f"{base_url}/api/v3/movie/editor"
+            headers = {"X-Api-Key": self.api_key}
+            payload = {"movieIds": list(movie_ids), "deleteFiles": True}
+
+            response = self.session.delete(
+                url, headers=headers, json=payload, timeout=(5, 120)
+            )
+            response.raise_for_status()
+            logger.info(f"Deleted {len(movie_ids)} movies from Radarr.")
+            return True
+        except Exception as e:
+            logger.error(f"Error deleting {len(movie_ids)} movies from Radarr: {e}")
+            return False
+
     def get_disk_space(self):
         if not self.host or not self.api_key:
             return []
@@ -78,7 +126,7 @@ class RadarrClient:
             url = f"{base_url}/api/v3/diskspace"
             headers = {"X-Api-Key": self.api_key}
 
-            response = requests.get(url, headers=headers, timeout=(5, 30))
+            response = self.session.get(url, headers=headers, timeout=(5, 30))
             response.raise_for_status()
             return response.json()
         except Exception as e:
@@ -94,7 +142,7 @@ class RadarrClient:
             url = f"{base_url}/api/v3/rootfolder"
             headers = {"X-Api-Key": self.api_key}
 
-            response = requests.get(url, headers=headers, timeout=(5, 30))
+            response = self.session.get(url, headers=headers, timeout=(5, 30))
             response.raise_for_status()
             return response.json()
         except Exception as e:
@@ -108,7 +156,7 @@ class RadarrClient:
             base_url = self.host.rstrip("/")
             url = f"{base_url}/api/v3/system/status"
             headers = {"X-Api-Key": self.api_key}
-            requests.get(url, headers=headers, timeout=5).raise_for_status()
+            self.session.get(url, headers=headers, timeout=5).raise_for_status()
             return True
         except Exception:
             return False
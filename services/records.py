@@ -0,0 +1,203 @@
+"""
+Compact media and torrent records produced by the matcher.
+
+Records keep raw numbers (ratios as floats, seed times in seconds); the
+display strings are only formatted when a template or the UI renders them.
+
+JSON schema of MediaRecord.to_dict(), as returned by /api/scan:
+{
+    "id": 123,
+    "origin": "Radarr" | "Sonarr",
+    "title": "Title",
+    "year": 2020,
+    "path": "/media/movies/Title (2020)",
+    "monitored": true,
+    "status": "Downloaded" | "Missing" | "Unmonitored" | "No Episodes" | "Partial (3/10)",
+    "file_loaded": true,
+    "size": 1500000000,             # bytes on disk
+    "volume": "/media" | null,      # mount holding the path, see services.disk_usage
+    "torrent_state": "uploading, stalledUP" | null,   # distinct states, null without torrents
+    "torrent_hashes": ["abc...", ...],
+    "ratio": 1.23 | null,           # movie: torrent ratio, series: average over torrents
+    "seed_time": 86400 | null,      # seconds; movie: torrent seed time, series: longest
+    "min_seed_time": 3600 | null,   # seconds; shortest seed time, used by the time rule
+    "watched": true,
+    "deletable": false,
+    "criteria": {"disk": true, "watched": true, "time": false, "ratio": true},
+    "torrents": [
+        {
+            "hash": "abc...",
+            "name": "Torrent name",
+            "label": "Movie" | "S01" | "S01E02" | ...,
+            "state": "uploading",
+            "ratio": 1.23,
+            "seed_time": 86400
+        }
+    ]
+}
+"""
+
+
+def format_seed_time(seconds):
+    if not seconds:
+        return "0s"
+    days = seconds // 86400
+    hours = (seconds % 86400) // 3600
+    if days > 0:
+        return f"{days}d {hours}h"
+    elif hours > 0:
+        minutes = (seconds % 3600) // 60
+        return f"{hours}h {minutes}m"
+    else:
+        minutes = (seconds % 3600) // 60
+        return f"{minutes}m"
+
+
+class TorrentRecord:
+    __slots__ = ("hash", "name", "label", "state", "ratio", "seed_time")
+
+    def __init__(self, torrent, label):
+        self.hash = torrent.get("hash")
+        self.name = torrent.get("name", "")
+        self.label = label
+        self.state = torrent.get("state")
+        self.ratio = torrent.get("ratio", 0)
+        self.seed_time = torrent.get("seeding_time", 0)
+
+    @property
+    def ratio_display(self):
+        return f"{self.ratio:.2f}"
+
+    @property
+    def seed_time_display(self):
+        return format_seed_time(self.seed_time)
+
+    def to_dict(self):
+        return {
+            "hash": self.hash,
+            "name": self.name,
+            "label": self.label,
+            "state": self.state,
+            "ratio": self.ratio,
+            "seed_time": self.seed_time,
+        }
+
+
+class MediaRecord:
+    __slots__ = (
+        "id",
+        "origin",
+        "title",
+        "year",
+        "path",
+        "monitored",
+        "status",
+        "file_loaded",
+        "size",
+        "volume",
+        "watched",
+        "torrents",
+        "ratio",
+        "seed_time",
+        "min_seed_time",
+        "deletable",
+        "c_disk",
+        "c_watched",
+        "c_time",
+        "c_ratio",
+    )
+
+    def __init__(self, origin, media, status, file_loaded, size=0, watched=False):
+        self.id = media.get("id")
+        self.origin = origin
+        self.title = media.get("title")
+        self.year = media.get("year")
+        self.path = media.get("path")
+        self.monitored = media.get("monitored", False)
+        self.status = status
+        self.file_loaded = file_loaded
+        self.size = size or 0
+        self.volume = None
+        self.watched = watched
+        self.torrents = []
+        self.ratio = None
+        self.seed_time = None
+        self.min_seed_time = None
+        self.deletable = False
+        self.c_disk = self.c_watched = self.c_time = self.c_ratio = False
+
+    def copy(self):
+        """Shallow copy; torrents are shared."""
+        clone = MediaRecord.__new__(MediaRecord)
+        for name in self.__slots__:
+            setattr(clone, name, getattr(self, name))
+        return clone
+
+    def set_torrents(self, torrents):
+        """Attaches matched torrents and derives the aggregated ratio and seed times."""
+        self.torrents = torrents
+        if not torrents:
+            self.ratio = self.seed_time = self.min_seed_time = None
+            return
+        seed_times = [t.seed_time for t in torrents]
+        self.ratio = sum(t.ratio for t in torrents) / len(torrents)
+        self.seed_time = max(seed_times)
+        self.min_seed_time = min(seed_times)
+
+    @property
+    def torrent_hashes(self):
+        return [t.hash for t in self.torrents]
+
+    @property
+    def torrent_state(self):
+        if not self.torrents:
+            return None
+        return ", ".join(dict.fromkeys(t.state for t in self.torrents))
+
+    @property
+    def criteria(self):
+        return {
+            "disk": self.c_disk,
+            "watched": self.c_watched,
+            "time": self.c_time,
+            "ratio": self.c_ratio,
+        }
+
+    @property
+    def ratio_display(self):
+        if self.ratio is None:
+            return "N/A"
+        if self.origin == "Sonarr":
+            return f"Avg: {self.ratio:.2f}"
+        return f"{self.ratio:.2f}"
+
+    @property
+    def seed_time_display(self):
+        if self.seed_time is None:
+            return "N/A"
+        if self.origin == "Sonarr":
+            return f"Max: {format_seed_time(self.seed_time)}"
+        return format_seed_time(self.seed_time)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "origin": self.origin,
+            "title": self.title,
+            "year": self.year,
+            "path": self.path,
+            "monitored": self.monitored,
+            "status": self.status,
+            "file_loaded": self.file_loaded,
+            "size": self.size,
+            "volume": self.volume,
+            "torrent_state": self.torrent_state,
+            "torrent_hashes": self.torrent_hashes,
+            "ratio": self.ratio,
+            "seed_time": self.seed_time,
+            "min_seed_time": self.min_seed_time,
+            "watched": self.watched,
+            "deletable": self.deletable,
+            "criteria": self.criteria,
+            "torrents": [t.to_dict() for t in self.torrents],
+        }
@@ -0,0 +1,82 @@
+"""
+Deletability rules, evaluated over already matched media records.
+
+Matching (fetching from the services and pairing media with torrents and
+Jellyfin items) does not depend on the rules, so a rules change only needs
+this cheap pass over the cached records.
+"""
+
+DEFAULT_RULES = {
+    "disk_threshold": 90,
+    "min_seed_weeks": 4,
+    "min_ratio": 1.0,
+}
+
+
+def volume_percents(disk_usage):
+    """
+    Usage percent by volume path, with the None key holding the percent used for
+    records on no known volume (the fullest volume, as shown on the dashboard).
+    """
+    if not disk_usage:
+        return {None: 0}
+    percents = {v["path"]: v["percent"] for v in disk_usage.get("volumes", [])}
+    percents[None] = disk_usage.get("percent", 0)
+    return percents
+
+
+def full_volumes(disk_usage, config):
+    """Paths of the volumes at or above the disk threshold (None: see volume_percents)."""
+    threshold = float(config.get("disk_threshold", 90))
+    return {
+        path
+        for path, percent in volume_percents(disk_usage).items()
+        if percent >= threshold
+    }
+
+
+def rule_values(record):
+    """
+    The (ratio, seed time) the ratio and time rules are checked against, or None
+    when they can never pass. A movie without torrent counts as 0 ratio / 0s
+    seeded, series use their average ratio and shortest seed time, and series
+    without torrents never pass.
+    """
+    if record.torrents or record.origin == "Radarr":
+        return (record.ratio or 0.0), (record.min_seed_time or 0)
+    return None
+
+
+def evaluate_record(record, config, full):
+    """
+    Sets the criteria flags and deletable status of `record` in place. `full` is
+    the set of full volumes from full_volumes().
+    """
+    weeks_seconds = float(config.get("min_seed_weeks", 4)) * 7 * 24 * 3600
+    min_ratio = float(config.get("min_ratio", 1.0))
+
+    record.c_disk = record.volume in full
+    record.c_watched = record.watched
+
+    values = rule_values(record)
+    if values is not None:
+        ratio, seed_time = values
+        record.c_time = seed_time >= weeks_seconds
+        record.c_ratio = ratio >= min_ratio
+    else:
+        record.c_time = False
+        record.c_ratio = False
+
+    record.deletable = (
+        record.c_disk and record.c_watched and record.c_time and record.c_ratio
+    )
+    return record
+
+
+def evaluate_records(records, config, disk_usage):
+    """
+    Returns evaluated copies of `records`, leaving the originals untouched so they
+    can be shared with readers of a previous evaluation.
+    """
+    full = full_volumes(disk_usage, config)
+    return [evaluate_record(record.copy(), config, full) for record in records]
@@ -0,0 +1,76 @@
+"""
+Metrics of a multi-worker server (see gunicorn.conf.py).
+
+Each worker process keeps its own registry (services.metrics) and publishes a
+dump of it to the shared store every METRICS_INTERVAL seconds. /metrics renders
+the dumps of all workers together, so a scrape covers the whole server
+whichever worker answers it, and counters never go down between scrapes.
+"""
+
+import logging
+import os
+import threading
+import time
+
+from services.config_manager import ConfigManager
+from services.metrics import REGISTRY
+from services.shared_store import get_store
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsPublisher:
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(MetricsPublisher, cls).__new__(cls)
+            cls._instance._lock = threading.Lock()
+            cls._instance._thread = None
+            cls._instance._pid = None
+        return cls._instance
+
+    def start(self):
+        """Starts the publisher thread, again in a forked worker process."""
+        with self._lock:
+            if (
+                self._thread is not None
+                and self._thread.is_alive()
+                and self._pid == os.getpid()
+            ):
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name="metrics-publisher", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(float(ConfigManager().get("METRICS_INTERVAL", 5)))
+            try:
+                self.publish()
+            except Exception as e:
+                logger.error(f"Failed to publish metrics: {e}")
+
+    def publish(self):
+        store = get_store()
+        if store is not None:
+            store.save_metrics(REGISTRY.dump())
+
+
+def render_metrics():
+    """Prometheus exposition of this process, or of every worker with a shared store."""
+    store = get_store()
+    if store is None:
+        return REGISTRY.render()
+    publisher = MetricsPublisher()
+    publisher.start()
+    try:
+        # This worker's own values are current, the others' up to METRICS_INTERVAL old
+        publisher.publish()
+        workers = store.load_metrics()
+    except Exception as e:
+        logger.error(f"Failed to load the metrics of other workers: {e}")
+        return REGISTRY.render()
+    return REGISTRY.render(workers)
@@ -0,0 +1,299 @@
+"""
+SQLite store shared by the worker processes of a multi-worker deployment
+(see gunicorn.conf.py). Enabled by setting SNAPSHOT_STORE to a database path.
+
+- snapshot: the last scan (matched records, disk usage, service statuses...)
+  as one pickled row with a version counter bumped on every write, so a worker
+  notices a newer snapshot with a single integer read.
+- locks: named leases, so only one worker refreshes the snapshot at a time. A
+  lease expires on its own if its worker dies.
+- jobs: deletion job state, so any worker can report the progress of a job
+  another one is running.
+- metrics: the metrics registry of every worker (services.shared_metrics), so
+  /metrics covers all of them.
+- state: small named JSON documents, e.g. the last health probe results.
+"""
+
+import json
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+
+from services.config_manager import ConfigManager
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshot (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL,
+    built_at REAL,
+    payload BLOB
+);
+CREATE TABLE IF NOT EXISTS locks (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    status TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS metrics (
+    worker TEXT PRIMARY KEY,
+    pid INTEGER NOT NULL,
+    alive INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS state (
+    name TEXT PRIMARY KEY,
+    updated_at REAL NOT NULL,
+    data TEXT NOT NULL
+);
+"""
+
+_store = None
+_store_lock = threading.Lock()
+
+
+class SharedStore:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._pid = os.getpid()
+        # Identifies this process as a lock owner
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            # WAL lets readers go on while a worker writes a snapshot
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA busy_timeout = 30000")
+        return conn
+
+    @property
+    def conn(self):
+        """Connection of the current thread (connections are not shared)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    # --- Snapshot ---
+
+    def snapshot_version(self):
+        row = self.conn.execute("SELECT version FROM snapshot WHERE id = 1").fetchone()
+        return row[0] if row else 0
+
+    def save_snapshot(self, data, built_at, expected_version=None):
+        """
+        Stores `data` (any picklable object) and returns its new version. With
+        `expected_version`, only stores it if the version is still that one, and
+        returns None otherwise.
+        """
+        payload = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+        return self._write_snapshot(payload, built_at, expected_version)
+
+    def clear_snapshot(self):
+        """Drops the snapshot; workers see a new version without payload."""
+        return self._write_snapshot(None, None)
+
+    def _write_snapshot(self, payload, built_at, expected_version=None):
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT version FROM snapshot WHERE id = 1").fetchone()
+            current = row[0] if row else 0
+            if expected_version is not None and current != expected_version:
+                conn.execute("ROLLBACK")
+                return None
+            version = current + 1
+            conn.execute(
+                "INSERT OR REPLACE INTO snapshot (id, version, built_at, payload) "
+                "VALUES (1, ?, ?, ?)",
+                (version, built_at, payload),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return version
+
+    def load_snapshot(self):
+        """Returns (version, data), data being None when there is no snapshot."""
+        row = self.conn.execute(
+            "SELECT version, payload FROM snapshot WHERE id = 1"
+        ).fetchone()
+        if row is None:
+            return 0, None
+        version, payload = row
+        if payload is None:
+            return version, None
+        try:
+            return version, pickle.loads(payload)
+        except Exception as e:
+            logger.error(f"Failed to load the shared snapshot: {e}")
+            return version, None
+
+    # --- Locks ---
+
+    def new_owner(self):
+        """
+        A distinct lock owner within this process, for a lock that must exclude
+        this process's other threads too. It still identifies the process (see
+        release_worker_locks()).
+        """
+        return f"{self.owner}-{uuid.uuid4().hex[:8]}"
+
+    def acquire_lock(self, name, lease, owner=None):
+        """
+        Takes (or renews) the lock for `lease` seconds, for `owner` (this process
+        by default). Returns False if held elsewhere.
+        """
+        owner = owner or self.owner
+        conn = self.conn
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT owner, expires_at FROM locks WHERE name = ?", (name,)
+            ).fetchone()
+            if row is not None and row[0] != owner and row[1] > now:
+                conn.execute("ROLLBACK")
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO locks (name, owner, expires_at) VALUES (?, ?, ?)",
+                (name, owner, now + lease),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return True
+
+    def release_lock(self, name, owner=None):
+        self.conn.execute(
+            "DELETE FROM locks WHERE name = ? AND owner = ?",
+            (name, owner or self.owner),
+        )
+
+    def release_worker_locks(self, pid):
+        """Releases the locks held by the (exited) process `pid`."""
+        self.conn.execute("DELETE FROM locks WHERE owner LIKE ?", (f"{pid}-%",))
+
+    def clear_locks(self):
+        self.conn.execute("DELETE FROM locks")
+
+    # --- Jobs ---
+
+    def save_job(self, job):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO jobs (id, created_at, status, data) VALUES (?, ?, ?, ?)",
+            (job["id"], job["created_at"], job["status"], json.dumps(job)),
+        )
+
+    def load_job(self, job_id):
+        row = self.conn.execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def prune_jobs(self, keep):
+        """Deletes finished jobs beyond the `keep` most recent ones."""
+        self.conn.execute(
+            "DELETE FROM jobs WHERE status NOT IN ('queued', 'running') AND id NOT IN "
+            "(SELECT id FROM jobs ORDER BY created_at DESC LIMIT ?)",
+            (keep,),
+        )
+
+    def interrupt_jobs(self):
+        """Marks queued and running jobs interrupted, for a start with no worker running."""
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT data FROM jobs WHERE status IN ('queued', 'running')"
+            ).fetchall()
+            for (data,) in rows:
+                job = json.loads(data)
+                job["status"] = "interrupted"
+                job["finished_at"] = time.time()
+                conn.execute(
+                    "UPDATE jobs SET status = ?, data = ? WHERE id = ?",
+                    (job["status"], json.dumps(job), job["id"]),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return len(rows)
+
+    # --- Metrics ---
+
+    def save_metrics(self, data):
+        """Stores the metrics dump of this process."""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO metrics (worker, pid, alive, updated_at, data) "
+            "VALUES (?, ?, 1, ?, ?)",
+            (self.owner, os.getpid(), time.time(), json.dumps(data)),
+        )
+
+    def load_metrics(self):
+        """Returns [(pid, alive, dump)] for every process that stored metrics."""
+        rows = self.conn.execute("SELECT pid, alive, data FROM metrics").fetchall()
+        return [(pid, bool(alive), json.loads(data)) for pid, alive, data in rows]
+
+    def mark_worker_dead(self, pid):
+        self.conn.execute(
+            "UPDATE metrics SET alive = 0 WHERE pid = ? AND alive = 1", (pid,)
+        )
+
+    def clear_metrics(self):
+        self.conn.execute("DELETE FROM metrics")
+
+    # --- State ---
+
+    def save_state(self, name, data):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO state (name, updated_at, data) VALUES (?, ?, ?)",
+            (name, time.time(), json.dumps(data)),
+        )
+
+    def load_state(self, name):
+        """Returns the document stored under `name`, or None."""
+        row = self.conn.execute("SELECT data FROM state WHERE name = ?", (name,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def clear_state(self):
+        self.conn.execute("DELETE FROM state")
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def get_store():
+    """
+    The shared store at SNAPSHOT_STORE, or None when it is not set (single
+    process). Each process opens its own store, also after a fork.
+    """
+    global _store
+    path = ConfigManager().get("SNAPSHOT_STORE")
+    if not path:
+        return None
+    with _store_lock:
+        if _store is None or _store.path != path or _store._pid != os.getpid():
+            _store = SharedStore(path)
+        return _store
@@ -0,0 +1,68 @@
+import threading
+
+
+class Flight:
+    """One in-flight call, shared by its caller (the leader) and any followers."""
+
+    def __init__(self):
+        self.result = None
+        self.error = None
+        self.followers = 0
+        self._done = threading.Event()
+
+    def wait(self, timeout=None):
+        """Blocks until the leader finishes; returns its result or raises its error."""
+        if not self._done.wait(timeout):
+            raise TimeoutError("Timed out waiting for the call in flight")
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key: the first caller runs the call,
+    later ones wait for and share its result (or error) instead of repeating it.
+    Once it finishes, the next call for the key runs again.
+
+    do() covers plain calls; begin() and end() let a leader produce the result
+    over a longer operation, e.g. while streaming a response.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def begin(self, key):
+        """Returns (flight, leader). The leader must call end() exactly once."""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.followers += 1
+                return flight, False
+            flight = self._flights[key] = Flight()
+            return flight, True
+
+    def end(self, key, flight, result=None, error=None):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight.result = result
+        flight.error = error
+        flight._done.set()
+
+    def in_flight(self, key):
+        with self._lock:
+            return key in self._flights
+
+    def do(self, key, fn):
+        flight, leader = self.begin(key)
+        if not leader:
+            return flight.wait()
+        try:
+            result = fn()
+        except BaseException as e:
+            self.end(key, flight, error=e)
+            raise
+        self.end(key, flight, result=result)
+        return result
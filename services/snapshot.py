@@ -0,0 +1,465 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+
+from services.config_manager import ConfigManager
+from services.disk_usage import DiskUsageService
+from services.matcher import MatcherService
+from services.metrics import SCAN_PHASE_DURATION, SNAPSHOT_BUILDS, SNAPSHOT_REQUESTS
+from services.profiling import current_trace, span, tracing
+from services.media_query import RULE_SORT_FIELDS, build_sort_index
+from services.rules import evaluate_records
+from services.shared_store import get_store
+from services.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+BUILD = "build"
+REFRESH_LOCK = "snapshot_refresh"
+# How often a worker checks whether the worker refreshing the shared snapshot is done
+LOCK_POLL_INTERVAL = 0.25
+
+
+class BuildAborted(Exception):
+    """The live scan leading a build stopped early, e.g. its client went away."""
+
+
+class SnapshotCache:
+    """
+    Process-wide cache of the aggregated scan result.
+
+    A snapshot holds everything the dashboard shows (media, disk usage, service
+    statuses and precomputed sort orders) along with the rules config it was
+    evaluated for. The matched records it was evaluated from are kept, so a rules
+    change only re-runs the rules pass (services.rules) without any upstream call.
+    Snapshots older than SCAN_CACHE_TTL are still served, while a background
+    thread rebuilds them (stale-while-revalidate). A missing snapshot or a forced
+    refresh is rebuilt synchronously.
+
+    Builds are single-flight: requests arriving while a build (or a live scan
+    streamed by /api/scan/stream) is running wait for it and share its result,
+    so a burst of requests costs one crawl of the upstream services.
+
+    invalidate() bumps a generation counter: a build that started before it
+    (e.g. while a deletion job was finishing) is discarded rather than stored, so
+    it cannot bring back items that were just deleted.
+
+    With SNAPSHOT_STORE set (multi-worker serving, see gunicorn.conf.py), built
+    snapshots are also written to the shared store (services.shared_store), and
+    each worker picks up a newer one from there before serving. Builds then take
+    the store's refresh lock, so only one worker refreshes at a time; the others
+    wait for it and load its snapshot.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(SnapshotCache, cls).__new__(cls)
+            cls._instance._snapshot = None
+            cls._instance._lock = threading.Lock()
+            cls._instance._refreshing = False
+            cls._instance.last_trace = None
+            cls._instance._flights = SingleFlight()
+            # Bumped by invalidate(); see build_token()
+            cls._instance._generation = 0
+            # Version of the shared store the current snapshot came from
+            cls._instance._store_version = 0
+        return cls._instance
+
+    def get(self, config, force=False):
+        if force:
+            SNAPSHOT_REQUESTS.inc(result="forced")
+        snapshot = None if force else self.get_cached(config)
+        if snapshot is None:
+            return self.refresh(config)
+        return snapshot
+
+    def get_cached(self, config):
+        """
+        Returns the cached snapshot for `config` without building one, or None.
+        A stale snapshot is still returned and refreshed in the background.
+        """
+        self._sync()
+        snapshot = self._snapshot
+        if snapshot is None:
+            SNAPSHOT_REQUESTS.inc(result="miss")
+            return None
+
+        result = "hit"
+        if snapshot["config"] != config:
+            # Concurrent requests for the new rules share one evaluation
+            key = ("evaluate", json.dumps(config, sort_keys=True))
+            snapshot = self._flights.do(key, lambda: self._reevaluate(snapshot, config))
+            result = "reevaluated"
+
+        ttl = float(ConfigManager().get("SCAN_CACHE_TTL", 300))
+        if self.age(snapshot) > ttl:
+            self._refresh_in_background(config)
+            result = "stale"
+        SNAPSHOT_REQUESTS.inc(result=result)
+        return snapshot
+
+    def age(self, snapshot):
+        return time.time() - snapshot["built_at"]
+
+    def refresh(self, config):
+        """
+        Rebuilds the snapshot. Concurrent refreshes share one build (see join()),
+        except under an active trace (e.g. /api/scan?profile=1), which gets its
+        own build so the trace covers it. Either way, the build takes the shared
+        store's refresh lock (see await_shared_build()).
+        """
+        if current_trace() is not None:
+            return self._build_shared(config, reuse=False)
+        flight, leader = self.begin_build()
+        if not leader:
+            return self.join(flight, config)
+        try:
+            snapshot = self._build_shared(config)
+        except BaseException as e:
+            self.end_build(flight, error=e)
+            raise
+        self.end_build(flight, snapshot)
+        return snapshot
+
+    def _build_shared(self, config, reuse=True):
+        """Builds and stores a snapshot behind the shared refresh lock."""
+        snapshot, holder = self.await_shared_build(config, reuse=reuse)
+        if snapshot is None:
+            try:
+                snapshot = self._build_and_store(config)
+            finally:
+                self.release_refresh(holder)
+        return snapshot
+
+    def begin_build(self):
+        """
+        Registers a build. Returns (flight, leader): the leader must build and call
+        end_build(); other callers should join() the flight.
+        """
+        return self._flights.begin(BUILD)
+
+    def end_build(self, flight, snapshot=None, error=None):
+        self._flights.end(BUILD, flight, result=snapshot, error=error)
+
+    def join(self, flight, config):
+        """
+        Waits for the build in flight and returns its snapshot, evaluated for
+        `config`. Builds again if its leader gave up, or its own snapshot when the
+        leader takes longer than twice FETCH_DEADLINE.
+        """
+        SNAPSHOT_BUILDS.inc(result="joined")
+        timeout = 2 * float(ConfigManager().get("FETCH_DEADLINE", 90))
+        try:
+            snapshot = flight.wait(timeout)
+        except BuildAborted:
+            return self.refresh(config)
+        except TimeoutError:
+            logger.warning("Timed out waiting for the snapshot build in flight.")
+            return self._build_shared(config)
+        if snapshot["config"] != config:
+            snapshot = self._reevaluate(snapshot, config)
+        return snapshot
+
+    def await_shared_build(self, config, reuse=True):
+        """
+        Takes the shared store's refresh lock before a build, waiting while another
+        holder (a worker, or another build of this one) has it. Returns
+        (snapshot, holder): the snapshot built meanwhile by the holder waited for,
+        evaluated for `config` (the lock is not kept then), or None, and the
+        caller builds, then calls release_refresh(holder). With `reuse` false, the
+        snapshot is always None: the caller builds anyway, e.g. a profiled build.
+        (None, None) without a shared store.
+        """
+        store = get_store()
+        if store is None:
+            return None, None
+        holder = store.new_owner()
+        # A build finishing meanwhile, here or in another worker, bumps the version
+        seen = self._store_version
+        # A holder that died leaves the lock at the latest when its lease ends
+        lease = 2 * float(ConfigManager().get("FETCH_DEADLINE", 90))
+        waited = False
+        while True:
+            try:
+                if store.acquire_lock(REFRESH_LOCK, lease, owner=holder):
+                    break
+            except Exception as e:
+                logger.error(f"Failed to take the snapshot refresh lock: {e}")
+                return None, None
+            waited = True
+            time.sleep(LOCK_POLL_INTERVAL)
+        if not waited or not reuse:
+            return None, holder
+        try:
+            version = store.snapshot_version()
+        except Exception as e:
+            logger.error(f"Failed to read the shared snapshot version: {e}")
+            return None, holder
+        if version == seen:
+            return None, holder
+        self.release_refresh(holder)
+        self._sync()
+        snapshot = self._snapshot
+        if snapshot is None:
+            # Invalidated rather than rebuilt; build after all
+            return self.await_shared_build(config)
+        SNAPSHOT_BUILDS.inc(result="shared")
+        if snapshot["config"] != config:
+            snapshot = self._reevaluate(snapshot, config)
+        return snapshot, None
+
+    def release_refresh(self, holder):
+        """Releases the refresh lock taken by await_shared_build() for `holder`."""
+        store = get_store()
+        if store is None or holder is None:
+            return
+        try:
+            store.release_lock(REFRESH_LOCK, owner=holder)
+        except Exception as e:
+            logger.error(f"Failed to release the snapshot refresh lock: {e}")
+
+    def build_token(self):
+        """
+        Identifies the cache state a build starts from: the generation and the
+        shared store version (None without a store). Pass it to store().
+        """
+        version = None
+        store = get_store()
+        if store is not None:
+            try:
+                version = store.snapshot_version()
+            except Exception as e:
+                logger.error(f"Failed to read the shared snapshot version: {e}")
+        return self._generation, version
+
+    def store(self, snapshot, token=None):
+        """
+        Stores a built snapshot. Returns False, discarding it, when the cache was
+        invalidated since `token` (see build_token()) was taken.
+        """
+        with self._lock:
+            if token is not None and token[0] != self._generation:
+                logger.info("Discarded a snapshot built before the cache was invalidated.")
+                return False
+            self._snapshot = snapshot
+        return self._publish(snapshot, token[1] if token is not None else None)
+
+    def _publish(self, snapshot, expected_version=None):
+        """Writes a newly built snapshot to the shared store, if any."""
+        store = get_store()
+        if store is None:
+            return True
+        try:
+            with span("publish"):
+                version = store.save_snapshot(
+                    snapshot, snapshot["built_at"], expected_version=expected_version
+                )
+        except Exception as e:
+            logger.error(f"Failed to write the snapshot to the shared store: {e}")
+            return True
+        if version is None:
+            # Cleared by another worker meanwhile; the next _sync() drops it here too
+            logger.info("Discarded a snapshot built before the shared store was cleared.")
+            return False
+        self._store_version = version
+        return True
+
+    def _sync(self):
+        """Loads the shared store's snapshot if it is newer than the current one."""
+        store = get_store()
+        if store is None:
+            return
+        try:
+            version = store.snapshot_version()
+        except Exception as e:
+            logger.error(f"Failed to read the shared snapshot version: {e}")
+            return
+        if version == self._store_version:
+            return
+        # Concurrent requests share one load
+        self._flights.do(("load", version), lambda: self._load(store))
+
+    def _load(self, store):
+        try:
+            with span("load_shared"):
+                version, snapshot = store.load_snapshot()
+        except Exception as e:
+            logger.error(f"Failed to load the shared snapshot: {e}")
+            return
+        if version > self._store_version:
+            if snapshot is None:
+                # Cleared by another worker, e.g. after deletions freed space
+                DiskUsageService().invalidate()
+            self._snapshot = snapshot
+            self._store_version = version
+
+    def _reevaluate(self, snapshot, config):
+        evaluated = self._evaluate(snapshot, config)
+        with self._lock:
+            # Not if it was invalidated or rebuilt meanwhile
+            if self._snapshot is snapshot:
+                self._snapshot = evaluated
+        return evaluated
+
+    def _build_and_store(self, config):
+        """
+        Builds and stores a snapshot. A build overtaken by invalidate() is run once
+        more from fresh data. With PROFILE_SCANS set, or under an active trace, the
+        build's trace is kept in last_trace.
+        """
+        for attempt in range(2):
+            SNAPSHOT_BUILDS.inc(result="built")
+            token = self.build_token()
+            if current_trace() is None and ConfigManager().get("PROFILE_SCANS", False):
+                with tracing("snapshot") as trace:
+                    snapshot = self._build(config)
+            else:
+                trace = current_trace()
+                snapshot = self._build(config)
+            if trace is not None:
+                self.last_trace = trace
+            if self.store(snapshot, token):
+                break
+        return snapshot
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._snapshot = None
+        store = get_store()
+        if store is None:
+            return
+        try:
+            self._store_version = store.clear_snapshot()
+        except Exception as e:
+            logger.error(f"Failed to clear the shared snapshot: {e}")
+
+    def _refresh_in_background(self, config):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.refresh(config)
+            except Exception as e:
+                logger.error(f"Background snapshot refresh failed: {e}")
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name="snapshot-refresh", daemon=True).start()
+
+    def _matched_version(self, base):
+        """
+        Hash of the matched data of a build, unchanged when a rebuild finds the
+        same data. Computed once per build: re-evaluations reuse it.
+        """
+        content = {k: base[k] for k in ("disk_usage", "services", "stale_sources")}
+        content["matched"] = [record.to_dict() for record in base["matched"]]
+        payload = json.dumps(content, sort_keys=True, default=str).encode()
+        return hashlib.sha1(payload).hexdigest()
+
+    def _content_version(self, snapshot):
+        """
+        Version of an evaluated snapshot: the evaluation only depends on the
+        matched data and the rules config, so hashing both identifies it.
+        """
+        payload = json.dumps(snapshot["config"], sort_keys=True).encode()
+        return hashlib.sha1(snapshot["matched_version"].encode() + payload).hexdigest()
+
+    def _build(self, config):
+        started = time.time()
+        matcher = MatcherService()
+        with span("match"):
+            matched = matcher.get_matched_media()
+        snapshot = self.from_matcher(matcher, matched, config)
+        logger.info(f"Built scan snapshot in {time.time() - started:.2f}s.")
+        return snapshot
+
+    def from_matcher(self, matcher, matched, config, evaluated=False):
+        """
+        Snapshot of the records `matcher` just matched, with the disk usage and
+        stale sources of that scan, evaluated for `config`. With `evaluated`, the
+        records already are (see SnapshotBuilder).
+        """
+        with span("service_statuses"):
+            services = matcher.get_service_statuses()
+        base = {
+            "matched": matched,
+            "disk_usage": matcher.disk_usage,
+            "services": services,
+            "stale_sources": matcher.stale_sources,
+            "built_at": time.time(),
+        }
+        with span("version"):
+            base["matched_version"] = self._matched_version(base)
+        return self._evaluate(base, config, evaluated=evaluated)
+
+    def _evaluate(self, base, config, evaluated=False):
+        """
+        Returns a snapshot of the matched data in `base` evaluated for `config`.
+        With `evaluated`, the matched records are already evaluated for `config`
+        and are used as they are.
+        """
+        started = time.time()
+        if evaluated:
+            media = base["matched"]
+        else:
+            with SCAN_PHASE_DURATION.time(phase="criteria"), span("criteria"):
+                media = evaluate_records(base["matched"], config, base["disk_usage"])
+        # Only items with files on disk are shown and paged
+        loaded_media = [record for record in media if record.file_loaded]
+        # Matching is unchanged, so only the rule-dependent orders are re-sorted
+        reuse = {
+            field: order
+            for field, order in base.get("orders", {}).items()
+            if field not in RULE_SORT_FIELDS
+        }
+        with span("sort_index"):
+            orders = build_sort_index(loaded_media, reuse=reuse)
+        snapshot = {
+            "config": dict(config),
+            "matched": base["matched"],
+            "media": media,
+            "loaded_media": loaded_media,
+            "orders": orders,
+            "disk_usage": base["disk_usage"],
+            "services": base["services"],
+            "stale_sources": base["stale_sources"],
+            "built_at": base["built_at"],
+            "matched_version": base.get("matched_version")
+            or self._matched_version(base),
+        }
+        snapshot["version"] = self._content_version(snapshot)
+        logger.info(
+            f"Evaluated rules {snapshot['config']} over {len(media)} items in {time.time() - started:.3f}s."
+        )
+        return snapshot
+
+
+class SnapshotBuilder:
+    """
+    Builds a snapshot from a live scan (MatcherService.iter_aggregated_media),
+    whose records are handed over one by one as they are streamed. They are
+    already evaluated for `config`, so the snapshot uses them as both its
+    matched and its evaluated records rather than keeping a copy of each.
+    """
+
+    def __init__(self, cache, config):
+        self.cache = cache
+        self.config = config
+        self.records = []
+
+    def add(self, record):
+        self.records.append(record)
+
+    def finish(self, matcher):
+        """Snapshot of the added records, with the disk usage and statuses of the scan."""
+        return self.cache.from_matcher(
+            matcher, self.records, self.config, evaluated=True
+        )
@@ -1,17 +1,19 @@
 import logging
 
-import requests
-
 from services.config_manager import ConfigManager
+from services.http import get_session
 
 logger = logging.getLogger(__name__)
 
 
 class SonarrClient:
+    CONFIG_KEYS = ("SONARR_HOST", "SONARR_API_KEY")
+
     def __init__(self):
         config = ConfigManager()
         self.host = config.get("SONARR_HOST")
         self.api_key = config.get("SONARR_API_KEY")
+        self.session = get_session("sonarr")
 
     def get_series(self):
         if not self.host or not self.api_key:
@@ -23,7 +25,7 @@ class SonarrClient:
             url = f"{base_url}/api/v3/series"
             headers = {"X-Api-Key": self.api_key}
 
-            response = requests.get(url, headers=headers, timeout=(5, 60))
+            response = self.session.get(url, headers=headers, timeout=(5, 60))
             response.raise_for_status()
             return response.json()
         except Exception as e:
@@ -39,7 +41,7 @@ class SonarrClient:
             url = f"{base_url}/api/v3/episode?seriesId={series_id}"
             headers = {"X-Api-Key": self.api_key}
 
-            response = requests.get(url, headers=headers, timeout=(5, 60))
+            response = self.session.get(url, headers=headers, timeout=(5, 60))
             response.raise_for_status()
             return response.json()
         except Exception as e:
@@ -58,7 +60,7 @@ class SonarrClient:
             headers = {"X-Api-Key": self.api_key}
             params = {"pageSize": page_size, "includeEpisode": "true"}
 
-            response = requests.get(
+            response = self.session.get(
                 url, headers=headers, params=params, timeout=(5, 60)
             )
             response.raise_for_status()
@@ -67,6 +69,32 @@ class SonarrClient:
             logger.error(f"Error fetching history from Sonarr: {e}")
             return []
 
+    def get_history_page(self, page=1, page_size=1000):
+        """Fetch one page of history, newest first. Returns the raw page or None on error."""
+        if not self.host or not self.api_key:
+            return None
+
+        try:
+            base_url = self.host.rstrip("/")
+            url = f"{base_url}/api/v3/history"
+            headers = {"X-Api-Key": self.api_key}
+            params = {
+                "page": page,
+                "pageSize": page_size,
+                "sortKey": "id",
+                "sortDirection": "descending",
+                "includeEpisode": "true",
+            }
+
+            response = self.session.get(
+                url, headers=headers, params=params, timeout=(5, 60)
+            )
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            logger.error(f"Error fetching history page {page} from Sonarr: {e}")
+            return None
+
     def delete_series(self, series_id):
         if not self.host or not self.api_key:
             return False
@@ -77,7 +105,7 @@ class SonarrClient:
             headers = {"X-Api-Key": self.api_key}
             params = {"deleteFiles": "true"}
 
-            response = requests.delete(
+            response = self.session.delete(
                 url, headers=headers, params=params, timeout=(5, 60)
             )
             response.raise_for_status()
@@ -87,6 +115,59 @@ class SonarrClient:
             logger.error(f"Error deleting series {series_id} from Sonarr: {e}")
             return False
 
+    def bulk_delete_series(self, series_ids):
+        """Deletes several series (and their files) through the series editor endpoint."""
+        if not self.host or not self.api_key or not series_ids:
+            return False
+
+        try:
+            base_url = self.host.rstrip("/")
+            url = f"{base_url}/api/v3/series/editor"
+            headers = {"X-Api-Key": self.api_key}
+            payload = {"seriesIds": list(series_ids), "deleteFiles": True}
+
+            response = self.session.delete(
+                url, headers=headers, json=payload, timeout=(5, 120)
+            )
+            response.raise_for_status()
+            logger.info(f"Deleted {len(series_ids)} series from Sonarr.")
+            return True
+        except Exception as e:
+            logger.error(f"Error deleting {len(series_ids)} series from Sonarr: {e}")
+            return False
+
+    def get_disk_space(self):
+        if not self.host or not self.api_key:
+            return []
+
+        try:
+            base_url = self.host.rstrip("/")
+            url = f"{base_url}/api/v3/diskspace"
+            headers = {"X-Api-Key": self.api_key}
+
+            response = self.session.get(url, headers=headers, timeout=(5, 30))
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            logger.error(f"Error fetching disk space from Sonarr: {e}")
+            return []
+
+    def get_root_folders(self):
+        if not self.host or not self.api_key:
+            return []
+
+        try:
+            base_url = self.host.rstrip("/")
+            url = f"{base_url}/api/v3/rootfolder"
+            headers = {"X-Api-Key": self.api_key}
+
+            response = self.session.get(url, headers=headers, timeout=(5, 30))
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            logger.error(f"Error fetching root folders from Sonarr: {e}")
+            return []
+
     def check_connection(self):
         if not self.host or not self.api_key:
             return False
@@ -94,7 +175,7 @@ class SonarrClient:
             base_url = self.host.rstrip("/")
             url = f"{base_url}/api/v3/system/status"
             headers = {"X-Api-Key": self.api_key}
-            requests.get(url, headers=headers, timeout=5).raise_for_status()
+            self.session.get(url, headers=headers, timeout=5).raise_for_status()
             return True
         except Exception:
             return False
@@ -0,0 +1,102 @@
+import numpy as np
+
+from services.rules import rule_values, volume_percents
+
+SWEEP_AXES = ("min_ratio", "min_seed_weeks", "disk_threshold")
+MAX_SWEEP_POINTS = 1_000_000
+WEEK_SECONDS = 7 * 24 * 3600
+
+
+def parse_axis(value, default):
+    """
+    Threshold values of one sweep axis, sorted and without duplicates.
+    Accepts a number, a list of numbers or a {"start", "stop", "step"} range
+    (stop included); None falls back to `default`.
+    """
+    if value is None:
+        values = [default]
+    elif isinstance(value, dict):
+        try:
+            start = float(value["start"])
+            stop = float(value["stop"])
+            step = float(value.get("step", 1))
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("Ranges need numeric 'start', 'stop' and 'step'")
+        if step <= 0:
+            raise ValueError("Range 'step' must be positive")
+        if (stop - start) / step > MAX_SWEEP_POINTS:
+            raise ValueError("Range has too many values")
+        # Half a step of slack so float steps still include `stop`
+        values = np.arange(start, stop + step / 2, step)
+    elif isinstance(value, list):
+        values = value
+    else:
+        values = [value]
+
+    try:
+        axis = np.unique(np.asarray(values, dtype=float))
+    except (TypeError, ValueError):
+        raise ValueError("Threshold values must be numbers")
+    if axis.size == 0 or not np.all(np.isfinite(axis)):
+        raise ValueError("Threshold values must be finite numbers")
+    return axis
+
+
+def _reverse_cumsum(grid):
+    for axis in range(grid.ndim):
+        grid = np.flip(np.cumsum(np.flip(grid, axis), axis=axis), axis)
+    return grid
+
+
+def sweep(records, disk_usage, axes):
+    """
+    Evaluates the deletability rules of services.rules over every combination
+    of the thresholds in `axes` (min_ratio, min_seed_weeks and disk_threshold
+    arrays, see parse_axis) at once.
+
+    Each item is binned by how many thresholds of each axis it passes, which
+    gives a 3D histogram of counts and sizes. A reverse cumulative sum along
+    every axis then turns it into, for each combination, the number of items
+    passing all three thresholds and their total size.
+
+    Returns {"eligible": counts, "reclaimable_bytes": sizes}, both indexed
+    [min_ratio][min_seed_weeks][disk_threshold].
+    """
+    ratios = axes["min_ratio"]
+    seed_times = axes["min_seed_weeks"] * WEEK_SECONDS
+    thresholds = axes["disk_threshold"]
+    shape = (ratios.size + 1, seed_times.size + 1, thresholds.size + 1)
+    if ratios.size * seed_times.size * thresholds.size > MAX_SWEEP_POINTS:
+        raise ValueError(f"A sweep is limited to {MAX_SWEEP_POINTS} combinations")
+
+    # Each item is checked against the volume it lives on
+    percents = volume_percents(disk_usage)
+
+    # Only watched items with torrent values can pass
+    candidates = []
+    for record in records:
+        if not record.watched:
+            continue
+        values = rule_values(record)
+        if values is not None:
+            disk_percent = percents.get(record.volume, percents[None])
+            candidates.append((values[0], values[1], disk_percent, record.size))
+    data = np.array(candidates, dtype=float).reshape(-1, 4)
+
+    # Number of thresholds of each axis the item passes (value >= threshold)
+    r_bin = np.searchsorted(ratios, data[:, 0], side="right")
+    t_bin = np.searchsorted(seed_times, data[:, 1], side="right")
+    d_bin = np.searchsorted(thresholds, data[:, 2], side="right")
+    flat = np.ravel_multi_index((r_bin, t_bin, d_bin), shape)
+
+    size = int(np.prod(shape))
+    counts = np.bincount(flat, minlength=size).reshape(shape)
+    sizes = np.bincount(flat, weights=data[:, 3], minlength=size).reshape(shape)
+
+    # Bin 0 holds items failing even the lowest threshold
+    counts = _reverse_cumsum(counts)[1:, 1:, 1:]
+    sizes = _reverse_cumsum(sizes)[1:, 1:, 1:]
+    return {
+        "eligible": counts.astype(np.int64),
+        "reclaimable_bytes": np.rint(sizes).astype(np.int64),
+    }